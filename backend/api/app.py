@@ -3,21 +3,60 @@ from dotenv import load_dotenv
 # Load env vars before importing any other modules that might use them
 load_dotenv()
 
+import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 import cocoindex
-from api.routes import router
+from api.routes import router, setup_cocoindex, engine
+from cocoindex_app.search import async_pool, ensure_vector_index, prepare_search_statements
 
 cocoindex.init()
 
-app = FastAPI(title="CodeMind API")
+# orjson serializes the large /search//activity payloads several times
+# faster than stdlib json, and handles datetimes/numpy natively.
+app = FastAPI(title="CodeMind API", default_response_class=ORJSONResponse)
+
+@app.on_event("startup")
+async def sync_flow_schema():
+    # Run flow setup once up front so the first /index doesn't pay for it.
+    setup_cocoindex()
+    # Warm the shared async pool; skipped when postgres isn't reachable/active.
+    try:
+        await async_pool().open()
+        ensure_vector_index()
+        prepare_search_statements()
+    except Exception as e:
+        print(f"Async pool open failed (postgres may not be active): {e}")
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    # Drivers keep a shared httpx.AsyncClient alive for keep-alive reuse;
+    # close it so shutdown doesn't leak the pool.
+    try:
+        await engine.llm.aclose()
+    except Exception as e:
+        print(f"LLM client close failed: {e}")
+
+# Explicit origins/methods/headers instead of wildcards: Starlette skips the
+# per-request wildcard handling, and max_age lets browsers cache preflights
+# for 24h so most OPTIONS traffic disappears entirely.
+_cors_origins = [o.strip() for o in os.environ.get("CORS_ORIGINS", "*").split(",") if o.strip()]
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # For demo purposes. In prod, restrict to frontend URL.
+    allow_origins=_cors_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=("GET", "POST", "OPTIONS"),
+    allow_headers=("authorization", "content-type", "x-no-cache"),
+    max_age=86400,
 )
 
+# Compress the chunky /search and /execute JSON bodies (code snippets gzip
+# ~5-10x). Stdlib-backed and negotiated via Accept-Encoding; the 1KB floor
+# keeps small status responses uncompressed, and the SSE route opts out via
+# Content-Encoding: identity so its frames aren't buffered.
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 app.include_router(router)
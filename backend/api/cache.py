@@ -0,0 +1,98 @@
+import hashlib
+import threading
+import numpy as np
+from cachetools import TTLCache
+
+# Cosine similarity threshold for treating two queries as "the same question".
+SIM_THRESHOLD = 0.9
+
+
+class SemanticCache:
+    """
+    Two-tier cache for search/execute results.
+
+    Tier 1: exact match on a SHA-256 key of the request fields.
+    Tier 2: cosine similarity against recently cached query embeddings,
+            namespaced per (repo, branch) so hits never cross repos.
+
+    Entries expire via TTL and the embedding matrix is capped per namespace.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600.0, threshold: float = SIM_THRESHOLD):
+        self.exact = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.threshold = threshold
+        self.max_per_namespace = 256
+        # namespace -> list of (key, normalized embedding as np.float32)
+        self._embeddings = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        raw = "|".join("" if p is None else str(p) for p in parts)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def namespace(repo, branch) -> str:
+        return f"{repo or '*'}@{branch or '*'}"
+
+    def get_exact(self, key: str):
+        return self.exact.get(key)
+
+    def get_semantic(self, namespace: str, embedding):
+        """Returns a cached result whose query embedding is >= threshold similar."""
+        with self._lock:
+            entries = self._embeddings.get(namespace)
+            if not entries:
+                return None
+            emb = np.asarray(embedding, dtype=np.float32)
+            norm = np.linalg.norm(emb)
+            if norm == 0:
+                return None
+            emb = emb / norm
+            matrix = np.stack([e[1] for e in entries])
+            sims = matrix @ emb
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                return None
+            key = entries[best][0]
+        # Exact tier owns TTL/LRU; a missing key means the entry expired.
+        return self.exact.get(key)
+
+    def put(self, namespace: str, key: str, embedding, result):
+        self.exact[key] = result
+        if embedding is None:
+            return
+        emb = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(emb)
+        if norm == 0:
+            return
+        emb = emb / norm
+        with self._lock:
+            entries = self._embeddings.setdefault(namespace, [])
+            entries.append((key, emb))
+            if len(entries) > self.max_per_namespace:
+                # Trimmed keys must leave the exact tier too: invalidate()
+                # only finds entries through this list, so anything dropped
+                # here would otherwise outlive a reindex until its TTL.
+                trimmed = entries[: len(entries) - self.max_per_namespace]
+                del entries[: len(entries) - self.max_per_namespace]
+                for old_key, _ in trimmed:
+                    self.exact.pop(old_key, None)
+
+    def invalidate(self, namespace: str = None):
+        """
+        Drop cached entries; pass None to clear everything (e.g. on /reset).
+
+        Matches by prefix: /execute namespaces extend the plain repo@branch
+        one with |-joined qualifiers, and a reindex must drop those too.
+        """
+        with self._lock:
+            if namespace is None:
+                self._embeddings.clear()
+                self.exact.clear()
+                return
+            prefix = namespace + "|"
+            matched = [ns for ns in self._embeddings if ns == namespace or ns.startswith(prefix)]
+            for ns in matched:
+                for key, _ in self._embeddings.pop(ns):
+                    self.exact.pop(key, None)
@@ -1,3 +0,0 @@
-def run_index():
-    stats = code_index_flow.update()
-    print("Index stats:", stats)
\ No newline at end of file
@@ -0,0 +1,30 @@
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+def _build_logger() -> logging.Logger:
+    """
+    App logger backed by a queue: emitting a record is just a queue.put,
+    and the actual stderr write happens on a dedicated listener thread, so
+    logging on the event loop / during parallel indexing never blocks.
+    """
+    log = logging.getLogger("codemind")
+    if log.handlers:
+        return log
+
+    log_queue = queue.SimpleQueue()
+    log.addHandler(QueueHandler(log_queue))
+    log.setLevel(logging.INFO)
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    listener = QueueListener(log_queue, handler)
+    listener.daemon = True
+    listener.start()
+    return log
+
+
+logger = _build_logger()
@@ -1,6 +1,11 @@
-from pydantic import BaseModel
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
 
 class IndexRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     namespace: str = "default"
     repo_url: str
     branch: str = "main"
+    # Clone depth; 1 = shallow (default), 0/None = full history.
+    depth: Optional[int] = 1
@@ -1,27 +1,71 @@
 import os
+import sys
 import shutil
 import uuid
-import datetime
-import subprocess
-import sys
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from pydantic import BaseModel
+import asyncio
+import inspect
+import json
+import functools
+import orjson
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict
 
 from foundation.engine import ReasoningEngine
+from foundation.context import bump_context_version
 from llm.factory import get_llm_client
 from policy.policy_engine import PolicyEngine
+from cachetools import TTLCache
+
+from api.cache import SemanticCache
+from api.logging_setup import logger
 from api.models import IndexRequest
 from indexing.git_utils import clone_repo
-from cocoindex_app.flow import code_index_flow
-from cocoindex_app.search import search, pool
+from cocoindex_app.flow import code_index_flow, FlowContext, set_flow_context
+from cocoindex_app.search import search, pool, async_pool, embed_query
 from memory_service.storage_manager import StorageManager
 
 router = APIRouter()
 storage_manager = StorageManager()
 engine = ReasoningEngine(get_llm_client(), storage_manager=storage_manager)
 policy = PolicyEngine()
+# Backend selection is static for the process; resolve it once at import
+# instead of re-parsing env vars inside request handlers.
+BACKEND = os.environ.get("STORAGE_BACKEND", "postgres")
+META_STORE = os.environ.get("METADATA_STORE", "sqlite" if BACKEND == "lancedb" else "postgres")
+
+@functools.cache
+def _faiss_store_cls():
+    from memory_service.faiss_store import FAISSStore
+    return FAISSStore
+
+# Shared two-tier (exact + semantic) result cache for /search and /execute.
+# Namespaced per (repo, branch) and invalidated on re-index / reset.
+search_cache = SemanticCache()
+# Single-flight: concurrent identical /search misses share one in-flight task
+# instead of each re-running the embedding + ANN work.
+_inflight_searches: dict = {}
+
+# One-shot guard: flow setup only needs to run once per process, and /index
+# calls setup_environment() on every request.
+_coco_setup_done = False
+
+def setup_cocoindex() -> str:
+    """Syncs the cocoindex flow schema in-process (no interpreter fork)."""
+    global _coco_setup_done
+    if _coco_setup_done:
+        return "synced"
+    try:
+        code_index_flow.setup(report_to_stdout=False)
+        _coco_setup_done = True
+        return "synced"
+    except Exception as e:
+        return f"failed: {e}"
 
 class Req(BaseModel):
+    # extra='forbid' + frozen keep pydantic-core on its strict fast path.
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     tenant: str
     repo: str
     branch: str = "main"
@@ -32,29 +76,144 @@ class Req(BaseModel):
     constraints: dict = {}
 
 @router.post("/execute")
-async def execute(r: Req):
+async def execute(r: Req, request: Request):
     policy.check("user", r.instruction)
-    return {"result": await engine.execute(
+    use_cache = "x-no-cache" not in request.headers
+    constraints_key = json.dumps(r.constraints, sort_keys=True)
+    key = SemanticCache.make_key(
+        r.tenant, r.repo, r.branch, r.instruction, r.context_query,
+        r.role, r.task, constraints_key
+    )
+    # Instructions only compare within the same tenant/repo/branch/role/task
+    # and constraint set — a json-constrained request must never be served
+    # an unconstrained cached answer. The repo@branch prefix is what
+    # reindexing invalidates by.
+    namespace = (
+        SemanticCache.namespace(r.repo, r.branch)
+        + f"|{r.tenant}|{r.role}|{r.task}|{constraints_key}"
+    )
+    if use_cache:
+        cached = search_cache.get_exact(key)
+        if cached is not None:
+            return {"result": cached}
+
+    instruction_vector = await embed_query(r.instruction)
+    if use_cache:
+        cached = search_cache.get_semantic(namespace, instruction_vector)
+        if cached is not None:
+            return {"result": cached}
+
+    result = await engine.execute(
         r.tenant, r.repo, r.branch, r.instruction, r.context_query, r.constraints,
         role=r.role, task=r.task
-    )}
+    )
+    search_cache.put(namespace, key, instruction_vector, result)
+    return {"result": result}
+
+def _search_response(results, fmt):
+    if fmt == "ndjson":
+        # Ship rows as they serialize instead of buffering the whole
+        # (potentially multi-MB) payload; first rows hit the client early.
+        return StreamingResponse(
+            (orjson.dumps(r) + b"\n" for r in results),
+            media_type="application/x-ndjson",
+        )
+    return {"results": results}
+
+class SearchReq(BaseModel):
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True, frozen=True)
+
+    query: str
+    repo: str | None = None
+    branch: str | None = None
+    ef_search: int | None = None
+    format: str | None = None
 
 @router.post("/search")
-async def search_endpoint(payload: dict):
-    query = payload.get("query")
-    repo = payload.get("repo")
-    branch = payload.get("branch")
+async def search_endpoint(r: SearchReq, request: Request):
+    query = r.query
+    repo = r.repo
+    branch = r.branch
+    fmt = r.format
     if not query:
         raise HTTPException(status_code=400, detail="Query is required")
-    
-    result = await search(query, repo=repo, branch=branch)
-    return {"results": result.results}
+
+    use_cache = "x-no-cache" not in request.headers
+    # ef_search changes what the index returns, so it partitions both cache
+    # tiers and the single-flight key — a deep search must never be served
+    # (or coalesced into) a default-depth one. The repo@branch prefix is
+    # what reindexing invalidates by.
+    key = SemanticCache.make_key(repo, branch, query, r.ef_search)
+    namespace = SemanticCache.namespace(repo, branch) + f"|{r.ef_search}"
+    if use_cache:
+        cached = search_cache.get_exact(key)
+        if cached is not None:
+            return _search_response(cached, fmt)
+
+    # Embed once: used for the semantic cache probe and, on miss, the search itself.
+    query_vector = await embed_query(query)
+    if use_cache:
+        cached = search_cache.get_semantic(namespace, query_vector)
+        if cached is not None:
+            return _search_response(cached, fmt)
+
+    task = _inflight_searches.get(key)
+    if task is None:
+        task = asyncio.ensure_future(search(
+            query, repo=repo, branch=branch, query_vector=query_vector,
+            ef_search=r.ef_search,
+        ))
+        _inflight_searches[key] = task
+        try:
+            result = await task
+        finally:
+            _inflight_searches.pop(key, None)
+        search_cache.put(namespace, key, query_vector, result.results)
+    else:
+        result = await task
+    return _search_response(result.results, fmt)
+
+class BatchSearchItem(BaseModel):
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True, frozen=True)
+
+    query: str
+    repo: str | None = None
+    branch: str | None = None
+    ef_search: int | None = None
+
+class BatchSearchReq(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+    requests: list[BatchSearchItem]
+
+@router.post("/search/batch")
+async def search_batch_endpoint(r: BatchSearchReq):
+    # One POST for N queries: embeddings dedupe through embed_query's memo
+    # caches and the per-query searches overlap instead of queueing behind
+    # separate round trips. Results come back in request order.
+    if not r.requests:
+        raise HTTPException(status_code=400, detail="At least one query is required")
+    vectors = await asyncio.gather(*(embed_query(i.query) for i in r.requests))
+    outputs = await asyncio.gather(*(
+        search(i.query, repo=i.repo, branch=i.branch, query_vector=v, ef_search=i.ef_search)
+        for i, v in zip(r.requests, vectors)
+    ))
+    return {"results": [o.results for o in outputs]}
+
+async def _warm_embedder():
+    # First embed_query call pays model load/compile; doing it here means
+    # the first real /search or /index after setup doesn't.
+    try:
+        await embed_query("warmup")
+    except Exception as e:
+        logger.warning(f"Embedding warmup failed (non-fatal): {e}")
+
 
 @router.post("/setup")
-def setup_environment():
+def setup_environment(background_tasks: BackgroundTasks):
     # 1. Database Setup (Only if postgres is active)
-    backend = os.environ.get("STORAGE_BACKEND", "postgres")
-    meta_store = os.environ.get("METADATA_STORE", "sqlite" if backend == "lancedb" else "postgres")
+    backend = BACKEND
+    meta_store = META_STORE
     
     if meta_store == "postgres":
         try:
@@ -81,7 +240,7 @@ def setup_environment():
                     else:
                         conn.commit()
         except Exception as e:
-            print(f"Postgres setup failed (ignoring as it might not be the active backend): {e}")
+            logger.warning(f"Postgres setup failed (ignoring as it might not be the active backend): {e}")
     
     # 2. Filesystem Setup
     root = os.environ.get("CODEBASE_ROOT", "./data/repos")
@@ -89,20 +248,10 @@ def setup_environment():
         os.makedirs(root, exist_ok=True)
     
     # 3. CocoIndex Setup
-    venv_python = sys.executable
-    try:
-        subprocess.run(
-            [venv_python, "-m", "cocoindex.cli", "setup", "-f", "cocoindex_app.flow"],
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        coco_status = "synced"
-    except subprocess.CalledProcessError as e:
-        coco_status = f"failed: {e.stderr}"
+    coco_status = setup_cocoindex()
     
     # 4. MongoDB Setup
-    if os.environ.get("STORAGE_BACKEND") == "faiss_mongo":
+    if BACKEND == "faiss_mongo":
         try:
             from memory_service.mongo_store import MongoStore
             MongoStore()
@@ -112,8 +261,12 @@ def setup_environment():
     else:
         mongo_status = "skipped"
 
+    # 5. Pre-warm the embedding model after the response goes out, so the
+    # first query doesn't eat the cold-start cost.
+    background_tasks.add_task(_warm_embedder)
+
     return {
-        "status": "environment_setup_complete", 
+        "status": "environment_setup_complete",
         "details": {
             "backend": backend,
             "meta_store": meta_store,
@@ -123,62 +276,93 @@ def setup_environment():
         }
     }
 
-async def run_indexing(index_id: str, repo_url: str, branch: str):
+# Clones are I/O-bound and can overlap (bounded so we don't saturate the
+# network/disk), but the flow update mutates global state — the index_proxy
+# symlink and env vars — so only one run may drive it at a time.
+_clone_semaphore = asyncio.Semaphore(int(os.environ.get("MAX_PARALLEL_CLONES", "4")))
+_flow_lock = asyncio.Lock()
+# Decide the clone dispatch once at import, not per request.
+_clone_is_async = inspect.iscoroutinefunction(clone_repo)
+
+async def _sm(fn, *args):
+    """Runs a blocking StorageManager/sqlite call off the event loop."""
+    return await asyncio.to_thread(fn, *args)
+
+# Dashboards poll /status about once a second per pipeline; don't let that
+# thrash the metadata store.
+_status_cache = TTLCache(maxsize=1024, ttl=1)
+
+async def run_indexing(index_id: str, repo_url: str, branch: str, depth: int = 1):
     try:
-        storage_manager.update_status(index_id, "cloning")
-        meta = clone_repo(repo_url, branch)
-        
-        # --- Update Symlink for Flow ---
-        # The flow monitors ./data/index_proxy. We point this link to the new repo.
-        proxy_path = os.path.abspath(os.path.join(os.getcwd(), "data", "index_proxy"))
-        target_repo_path = os.path.abspath(meta["path"])
-        
-        if os.path.exists(proxy_path) or os.path.islink(proxy_path):
-            if os.path.isdir(proxy_path) and not os.path.islink(proxy_path):
-                 shutil.rmtree(proxy_path)
+        await _sm(storage_manager.update_status, index_id, "cloning")
+        async with _clone_semaphore:
+            if _clone_is_async:
+                meta = await clone_repo(repo_url, branch, depth)
             else:
-                 os.unlink(proxy_path)
-                 
-        os.symlink(target_repo_path, proxy_path)
-        # -------------------------------
-
-        os.environ["CODEBASE_PATH"] = target_repo_path
-        os.environ["REPO_NAME"] = meta["repo"]
-        os.environ["BRANCH_NAME"] = meta["branch"]
-        os.environ["INDEX_RUN_ID"] = meta["run_id"]
-
-        storage_manager.update_status(index_id, "analyzing_ast")
-        await code_index_flow.update_async()
-
-        if os.environ.get("STORAGE_BACKEND") == "faiss_mongo":
-            storage_manager.update_status(index_id, "vectorizing")
-            from memory_service.faiss_store import FAISSStore
-            import numpy as np
-            output = await code_index_flow.query("get_all_embeddings").eval_async()
-            faiss_store = FAISSStore()
-            faiss_store.reset()
-            embeddings = []
-            metadata = []
-            for item in output.results:
-                embeddings.append(item["embedding"])
-                meta_item = {k: v for k, v in item.items() if k != "embedding"}
-                metadata.append(meta_item)
-            if embeddings:
-                faiss_store.add(np.array(embeddings).astype('float32'), metadata)
-                faiss_store.save()
-
-        storage_manager.update_status(index_id, "completed")
+                meta = await asyncio.to_thread(clone_repo, repo_url, branch, depth)
+
+        async with _flow_lock:
+            await _run_flow_update(index_id, meta)
+
+        await _sm(storage_manager.update_status, index_id, "completed")
+        # Fresh index content: drop cached answers for this repo/branch.
+        search_cache.invalidate(SemanticCache.namespace(meta["repo"], meta["branch"]))
+        bump_context_version()
     except Exception as e:
-        print(f"Indexing failed for {index_id}: {e}")
-        storage_manager.update_status(index_id, "failed", error=str(e))
+        logger.exception(f"Indexing failed for {index_id}: {e}")
+        await _sm(storage_manager.update_status, index_id, "failed", str(e))
+
+async def _run_flow_update(index_id: str, meta: dict):
+    # --- Update Symlink for Flow ---
+    # The flow monitors ./data/index_proxy. We point this link to the new repo.
+    proxy_path = os.path.abspath(os.path.join(os.getcwd(), "data", "index_proxy"))
+    target_repo_path = os.path.abspath(meta["path"])
+    
+    if os.path.exists(proxy_path) or os.path.islink(proxy_path):
+        if os.path.isdir(proxy_path) and not os.path.islink(proxy_path):
+             shutil.rmtree(proxy_path)
+        else:
+             os.unlink(proxy_path)
+             
+    os.symlink(target_repo_path, proxy_path)
+    # -------------------------------
+
+    # Caller holds _flow_lock, so this global context can't race.
+    set_flow_context(FlowContext(
+        codebase_path=target_repo_path,
+        repo=meta["repo"],
+        branch=meta["branch"],
+        run_id=meta["run_id"],
+    ))
+
+    await _sm(storage_manager.update_status, index_id, "analyzing_ast")
+    await code_index_flow.update_async()
+
+    if BACKEND == "faiss_mongo":
+        await _sm(storage_manager.update_status, index_id, "vectorizing")
+        import numpy as np
+        output = await code_index_flow.query("get_all_embeddings").eval_async()
+        faiss_store = _faiss_store_cls()()
+        faiss_store.reset()
+        # Preallocate the matrix and write rows in place: one memcpy per row
+        # instead of list-of-arrays -> object array -> float32 double copy.
+        n = len(output.results)
+        if n:
+            arr = np.empty((n, faiss_store.dimension), dtype=np.float32)
+            metadata = [None] * n
+            for i, item in enumerate(output.results):
+                arr[i] = item["embedding"]
+                metadata[i] = {k: v for k, v in item.items() if k != "embedding"}
+            faiss_store.add(arr, metadata)
+            faiss_store.save()
 
 @router.post("/index")
 async def index_repo(req: IndexRequest, background_tasks: BackgroundTasks):
     try:
-        setup_environment()
+        setup_environment(background_tasks)
         index_id = str(uuid.uuid4())
         storage_manager.create_status(index_id, req.repo_url, req.branch, req.namespace)
-        background_tasks.add_task(run_indexing, index_id, req.repo_url, req.branch)
+        background_tasks.add_task(run_indexing, index_id, req.repo_url, req.branch, req.depth)
         return {
             "status": "indexing_started",
             "index_id": index_id,
@@ -187,13 +371,31 @@ async def index_repo(req: IndexRequest, background_tasks: BackgroundTasks):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/index/batch")
+async def index_repos_batch(reqs: list[IndexRequest], background_tasks: BackgroundTasks):
+    """Onboards several repos at once; clones overlap up to MAX_PARALLEL_CLONES."""
+    try:
+        setup_environment(background_tasks)
+        started = []
+        for req in reqs:
+            index_id = str(uuid.uuid4())
+            storage_manager.create_status(index_id, req.repo_url, req.branch, req.namespace)
+            background_tasks.add_task(run_indexing, index_id, req.repo_url, req.branch, req.depth)
+            started.append({"index_id": index_id, "repo_url": req.repo_url, "branch": req.branch})
+        return {"status": "indexing_started", "indexes": started}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/status/{index_id}")
 async def get_index_status(index_id: str):
-    status = storage_manager.get_status(index_id)
+    status = _status_cache.get(index_id)
+    if status is None:
+        status = await _sm(storage_manager.get_status, index_id)
+        if status:
+            _status_cache[index_id] = status
     if not status:
         raise HTTPException(status_code=404, detail="Index ID not found")
-    if isinstance(status.get("created_at"), datetime.datetime):
-        status["created_at"] = status["created_at"].isoformat()
+    # orjson serializes datetime natively; no isoformat() needed here.
     return {
         "index_id": index_id,
         "status": status["status"],
@@ -203,33 +405,82 @@ async def get_index_status(index_id: str):
         "branch": status["branch"]
     }
 
+# Only these end the stream; everything else ("cloning", "analyzing_ast",
+# "vectorizing", ...) is a transient state the worker moves through, and
+# enumerating those instead would silently break when a new one is added.
+_TERMINAL_STATUSES = ("completed", "failed")
+
+@router.get("/status/{index_id}/stream")
+async def stream_index_status(index_id: str):
+    # SSE push: the client holds one connection and receives a frame per
+    # transition instead of polling /status N times; the server-side watch
+    # is a cheap metadata read every 250ms that ends at a terminal state.
+    async def gen():
+        last = None
+        while True:
+            status = await _sm(storage_manager.get_status, index_id)
+            if not status:
+                yield b'data: {"status": "not_found"}\n\n'
+                return
+            current = status["status"]
+            if current != last:
+                last = current
+                yield b"data: " + orjson.dumps(
+                    {"status": current, "error": status.get("error")}
+                ) + b"\n\n"
+            if current in _TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(0.25)
+    # Content-Encoding: identity opts this stream out of the gzip
+    # middleware, which would otherwise buffer the tiny SSE frames.
+    return StreamingResponse(
+        gen(),
+        media_type="text/event-stream",
+        headers={"Content-Encoding": "identity", "Cache-Control": "no-cache"},
+    )
+
 from fastapi.responses import JSONResponse
 
+# Dashboard polls /metrics constantly; serve a 30s-stale copy instead of
+# hitting the database every refresh.
+_metrics_cache = TTLCache(maxsize=1, ttl=30)
+
 @router.get("/metrics")
-async def get_metrics():
+async def get_metrics(exact: bool = False):
+    if not exact:
+        cached = _metrics_cache.get("metrics")
+        if cached is not None:
+            return cached
     try:
         try:
             # Get metadata counts from storage manager (sqlite/mongo/postgres)
-            counts = storage_manager.get_counts()
+            counts = await _sm(storage_manager.get_counts)
         except Exception as e:
-            print(f"Error getting counts: {e}")
+            logger.warning(f"Error getting counts: {e}")
             # Return empty counts to prevent UI crash
             counts = {"indexed_repos": 0, "success_runs": 0}
         
         # Total Embeddings (Best effort from Postgres)
         total_embeddings = 0
         try:
-            with pool().connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute("SELECT COUNT(*) FROM code_embeddings")
-                    res = cur.fetchone()
-                    if res:
+            async with async_pool().connection() as conn:
+                async with conn.cursor() as cur:
+                    if exact:
+                        await cur.execute("SELECT COUNT(*) FROM code_embeddings")
+                    else:
+                        # Planner estimate (refreshed by ANALYZE/autovacuum):
+                        # O(1) catalog lookup vs a full heap scan.
+                        await cur.execute(
+                            "SELECT reltuples::bigint FROM pg_class WHERE relname = 'code_embeddings'"
+                        )
+                    res = await cur.fetchone()
+                    if res and res[0] is not None and res[0] >= 0:
                         total_embeddings = res[0]
         except Exception:
             # Ignore if table doesn't exist or other error
             pass
-                
-        return {
+
+        payload = {
             "indexed_assets": counts["indexed_repos"],
             "reasoning_calls": 0, # Placeholder until we have a logs table
             "semantic_depth": "384-dim",
@@ -237,55 +488,85 @@ async def get_metrics():
             "total_embeddings": total_embeddings,
             "success_rate": f"{(counts['success_runs'] / (counts['success_runs'] + 1) * 100):.1f}%" if counts['success_runs'] > 0 else "100%"
         }
+        if not exact:
+            _metrics_cache["metrics"] = payload
+        return payload
     except Exception as e:
         import traceback
         return JSONResponse(status_code=500, content={"detail": str(e), "trace": traceback.format_exc()})
 
 @router.get("/activity")
 async def get_activity(limit: int = 50):
-    return storage_manager.get_activity(limit)
+    return await _sm(storage_manager.get_activity, limit)
 
 @router.get("/live")
 async def get_live_pipelines():
-    return storage_manager.get_live_pipelines()
+    return await _sm(storage_manager.get_live_pipelines)
 
 @router.get("/repos")
 async def get_indexed_repos():
-    return storage_manager.get_indexed_repos()
+    return await _sm(storage_manager.get_indexed_repos)
 
 @router.get("/executions")
 async def get_executions(repo: str = None, limit: int = 50):
     """Retrieve execution logs from the active storage backend."""
-    return storage_manager.get_executions(repo, limit)
+    return await _sm(storage_manager.get_executions, repo, limit)
 
 @router.post("/reset")
-def reset_all_data():
-    backend = os.environ.get("STORAGE_BACKEND", "postgres")
-    meta_store = os.environ.get("METADATA_STORE", "sqlite" if backend == "lancedb" else "postgres")
+async def reset_all_data():
+    backend = BACKEND
+    meta_store = META_STORE
     
     if meta_store == "postgres" or backend == "postgres":
         try:
-            with pool().connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute("SELECT tablename FROM pg_tables WHERE schemaname='public'")
-                    tables = [r[0] for r in cur.fetchall()]
-                    if tables:
-                        tables_sql = ", ".join([f'"{t}"' for t in tables])
-                        cur.execute(f"TRUNCATE TABLE {tables_sql} CASCADE")
-                        conn.commit()
+            async with async_pool().connection() as conn:
+                async with conn.cursor() as cur:
+                    # One round trip: let Postgres quote identifiers itself
+                    # via format('%I', ...) instead of Python f-strings.
+                    await cur.execute(
+                        "SELECT string_agg(format('%I', tablename), ', ') "
+                        "FROM pg_tables WHERE schemaname = 'public'"
+                    )
+                    res = await cur.fetchone()
+                    if res and res[0]:
+                        # Fail fast instead of queueing behind long CASCADE locks.
+                        await cur.execute("SET LOCAL lock_timeout = '5s'")
+                        await cur.execute(f"TRUNCATE TABLE {res[0]} RESTART IDENTITY CASCADE")
+                    await conn.commit()
         except Exception:
             pass
             
-    storage_manager.reset_all()
+    await _sm(storage_manager.reset_all)
+    search_cache.invalidate()
+    bump_context_version()
     codebase_root = os.environ.get("CODEBASE_ROOT", "./data/repos")
     if os.path.exists(codebase_root):
-        for item in os.listdir(codebase_root):
-            item_path = os.path.join(codebase_root, item)
-            try:
-                if os.path.isfile(item_path) or os.path.islink(item_path):
-                    os.unlink(item_path)
-                elif os.path.isdir(item_path):
-                    shutil.rmtree(item_path)
-            except Exception as e:
-                print(f"Failed to delete {item_path}. Reason: {e}")
+        # scandir caches the entry type from getdents, so we skip the extra
+        # stat per entry; deletions still run concurrently off the loop.
+        with os.scandir(codebase_root) as it:
+            entries = [(e.path, e.is_dir(follow_symlinks=False)) for e in it]
+        if _RESET_USE_RM and entries:
+            # Kernel-side tree walk (getdents64 + batched unlinks) beats
+            # Python's per-file stat/unlink recursion on big clones.
+            proc = await asyncio.create_subprocess_exec(
+                "rm", "-rf", "--", *[path for path, _ in entries]
+            )
+            await proc.wait()
+        else:
+            await asyncio.gather(*[
+                asyncio.to_thread(_delete_path, path, is_dir)
+                for path, is_dir in entries
+            ])
     return {"status": "setup_reset_complete"}
+
+# Prefer the OS tree-delete on Linux; portable threaded fallback elsewhere.
+_RESET_USE_RM = sys.platform == "linux" and shutil.which("rm") is not None
+
+def _delete_path(item_path: str, is_dir: bool):
+    try:
+        if is_dir:
+            shutil.rmtree(item_path, ignore_errors=True)
+        else:
+            os.unlink(item_path)
+    except OSError as e:
+        logger.warning(f"Failed to delete {item_path}. Reason: {e}")
@@ -1,82 +1,244 @@
 import os
 import re
+import time
+import atexit
+import sqlite3
+import functools
+import threading
+from concurrent.futures import Future
+import orjson
+import xxhash
 import cocoindex
+from dataclasses import dataclass
 from numpy.typing import NDArray
 import numpy as np
 from tree_sitter_languages import get_language, get_parser
 
+# -------------------------------
+# Per-run flow context
+# -------------------------------
+
+@dataclass(frozen=True)
+class FlowContext:
+    """Metadata for the repo currently being indexed."""
+    codebase_path: str
+    repo: str
+    branch: str
+    run_id: str
+
+
+def set_flow_context(ctx: FlowContext):
+    """
+    Installs the context the flow reads for the next update.
+
+    The cocoindex update API takes no per-run parameters and the flow picks
+    its metadata up from the environment, so this is the single place that
+    mutation happens. Callers must hold the indexing flow lock — the context
+    is process-global, which is why updates are serialized in routes.py.
+    """
+    os.environ["CODEBASE_PATH"] = ctx.codebase_path
+    os.environ["REPO_NAME"] = ctx.repo
+    os.environ["BRANCH_NAME"] = ctx.branch
+    os.environ["INDEX_RUN_ID"] = ctx.run_id
+
 # -------------------------------
 # AST Extraction Logic
 # -------------------------------
 
+# Node types checked once per AST node; frozensets make that an O(1) hash hit.
+DEF_TYPES = frozenset([
+    "function_definition", "class_definition", "method_definition",
+    "function_item", "struct_item", "trait_item",
+])
+CALL_TYPES = frozenset(["call", "call_expression", "invocation", "function_call"])
+
+# Languages we know how to walk; order matters ("typescript" before "script"
+# style substring hits aren't an issue here, but cpp must come before c).
+_LANG_KEYS = ("python", "javascript", "typescript", "rust", "go", "java", "cpp", "c")
+
+# Exact names the extension map emits (plus grammars the substring scan
+# can't reach, like tsx); one dict hit instead of a substring loop.
+_LANG_EXACT = {k: k for k in _LANG_KEYS}
+_LANG_EXACT.update({"tsx": "tsx", "ruby": "ruby", "php": "php"})
+
+@functools.lru_cache(maxsize=256)
+def _resolve_lang(language_name: str):
+    """Maps a detected language label to a tree-sitter key (None = skip)."""
+    lang_lower = str(language_name).lower()
+    exact = _LANG_EXACT.get(lang_lower)
+    if exact is not None:
+        return exact
+    for key in _LANG_KEYS:
+        if key in lang_lower:
+            return key
+    return None
+
+@functools.lru_cache(maxsize=None)
+def _get_parser(l_key: str):
+    # get_parser re-resolves the grammar library on each call; one parser
+    # per language per process is plenty.
+    return get_parser(l_key)
+
+
+# Persistent AST-metadata cache: extraction is pure in (code, language), so
+# on reindex unchanged chunks skip the tree-sitter walk entirely. Keyed by
+# xxh3 of the chunk bytes (~10GB/s, negligible next to parsing).
+
+@functools.cache
+def _meta_cache_db():
+    db = sqlite3.connect(
+        os.environ.get("AST_META_CACHE_PATH", "./data/ast_meta_cache.db"),
+        check_same_thread=False,
+    )
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("CREATE TABLE IF NOT EXISTS ast_meta (hash BLOB PRIMARY KEY, meta BLOB)")
+    db.commit()
+    return db
+
+
+_meta_write_buffer = {}
+_META_FLUSH_SIZE = 1000
+
+
+def _flush_meta_cache():
+    if not _meta_write_buffer:
+        return
+    try:
+        db = _meta_cache_db()
+        db.executemany(
+            "INSERT OR REPLACE INTO ast_meta (hash, meta) VALUES (?, ?)",
+            list(_meta_write_buffer.items()),
+        )
+        db.commit()
+    except Exception as e:
+        print(f"AST metadata cache flush failed: {e}")
+    _meta_write_buffer.clear()
+
+
+atexit.register(_flush_meta_cache)
+
+
+# Bump when the extraction output format changes so stale cache entries
+# (e.g. pre-lowercasing) are not replayed.
+_META_VERSION = b"\x02"
+
+
+def _cached_ast_meta(code_bytes: bytes):
+    h = xxhash.xxh3_128_digest(_META_VERSION + code_bytes)
+    buffered = _meta_write_buffer.get(h)
+    if buffered is not None:
+        return h, orjson.loads(buffered)
+    try:
+        row = _meta_cache_db().execute(
+            "SELECT meta FROM ast_meta WHERE hash = ?", (h,)
+        ).fetchone()
+    except Exception:
+        row = None
+    if row is not None:
+        return h, orjson.loads(row[0])
+    return h, None
+
+
+def _store_ast_meta(h: bytes, result: dict):
+    _meta_write_buffer[h] = orjson.dumps(result)
+    if len(_meta_write_buffer) >= _META_FLUSH_SIZE:
+        _flush_meta_cache()
+
 def get_ast_metadata(code: str, language_name: str):
     """
     Extracts definitions and calls from code using tree-sitter.
     """
     try:
-        # Normalize language names for tree-sitter
-        lang_map = {
-            "python": "python",
-            "javascript": "javascript",
-            "typescript": "typescript",
-            "rust": "rust",
-            "go": "go",
-            "java": "java",
-            "cpp": "cpp",
-            "c": "c",
-        }
-        
-        l_key = None
-        lang_lower = str(language_name).lower()
-        for k, v in lang_map.items():
-            if k in lang_lower:
-                l_key = v
-                break
-        
+        l_key = _resolve_lang(language_name)
         if not l_key:
             return {"symbols": [], "calls": []}
 
-        parser = get_parser(l_key)
-        tree = parser.parse(bytes(code, "utf8"))
-        
+        code_bytes = bytes(code, "utf8")
+        h, cached = _cached_ast_meta(code_bytes)
+        if cached is not None:
+            return cached
+
+        parser = _get_parser(l_key)
+        tree = parser.parse(code_bytes)
+
         symbols = set()
         calls = set()
-        
+
         # Simple queries for definitions across languages (best effort)
         # Note: In a real prod sys we'd use language-specific queries.
         # But this generic approach covers most 'name' identifiers in defs.
-        
-        def traverse(node):
-            # Definitions check (very basic heuristic)
-            if node.type in ["function_definition", "class_definition", "method_definition", "function_item", "struct_item", "trait_item"]:
+        # Iterative TreeCursor preorder walk: no Python recursion frame per
+        # node, and name slices stay as bytes until the final decode.
+        cursor = tree.walk()
+        while True:
+            node = cursor.node
+            if node.type in DEF_TYPES:
                 # Look for name child
                 for child in node.children:
                     if "name" in child.type or child.type == "identifier":
-                        symbols.add(code[child.start_byte:child.end_byte])
+                        symbols.add(code_bytes[child.start_byte:child.end_byte])
                         break
-            
-            # Calls check
-            if node.type in ["call", "call_expression", "invocation", "function_call"]:
+            elif node.type in CALL_TYPES:
                 # Look for the function name
                 for child in node.children:
                     if child.type in ["identifier", "field_identifier", "member_expression"]:
-                        calls.add(code[child.start_byte:child.end_byte])
+                        calls.add(code_bytes[child.start_byte:child.end_byte])
                         break
-                        
-            for child in node.children:
-                traverse(child)
-                
-        traverse(tree.root_node)
-        return {"symbols": sorted(list(symbols)), "calls": sorted(list(calls))}
+
+            if cursor.goto_first_child():
+                continue
+            while not cursor.goto_next_sibling():
+                if not cursor.goto_parent():
+                    # Lowercased at extraction time so the search side can
+                    # match against lowercased query terms directly (both
+                    # the SQL && overlap and the Python set intersection)
+                    # without a per-row lowering pass.
+                    result = {
+                        "symbols": sorted({s.decode("utf8", "replace").lower() for s in symbols}),
+                        "calls": sorted({c.decode("utf8", "replace").lower() for c in calls}),
+                    }
+                    _store_ast_meta(h, result)
+                    return result
     except Exception as e:
         print(f"AST parsing failed for {language_name}: {e}")
         return {"symbols": [], "calls": []}
 
+# The flow engine invokes ops from multiple threads, but the AST walk is
+# pure Python so the GIL serializes it. AST_POOL_WORKERS>0 opts into a
+# process pool that restores real parallelism for CPU-heavy indexing runs
+# (at the cost of pickling each chunk across the process boundary).
+_AST_POOL_WORKERS = int(os.environ.get("AST_POOL_WORKERS", "0"))
+
+@functools.cache
+def _ast_pool():
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=_AST_POOL_WORKERS)
+
 @cocoindex.op.function()
 def extract_code_metadata(code: str, language: str) -> cocoindex.Json:
     """Uses tree-sitter to extract rich structural metadata."""
+    if _AST_POOL_WORKERS:
+        return _ast_pool().submit(get_ast_metadata, code, language).result()
     return get_ast_metadata(code, language)
 
+# Extension -> language for every pattern the source includes. For source
+# files the extension is the answer; running a heuristic detector per file
+# buys nothing here. .h is mapped to C — close enough for chunking and for
+# the tree-sitter walk, which treats C/C++ headers near-identically.
+_EXT2LANG = {
+    ".py": "python", ".md": "markdown", ".mdx": "markdown", ".rs": "rust",
+    ".toml": "toml", ".js": "javascript", ".jsx": "javascript",
+    ".ts": "typescript", ".tsx": "tsx", ".java": "java",
+    ".c": "c", ".cpp": "cpp", ".h": "c", ".hpp": "cpp",
+    ".go": "go", ".rb": "ruby", ".php": "php", ".sh": "shell",
+    ".yaml": "yaml", ".yml": "yaml", ".json": "json", ".sql": "sql",
+}
+
+@cocoindex.op.function()
+def detect_language(filename: str) -> str:
+    """Maps a filename to its language by extension (one dict lookup)."""
+    return _EXT2LANG.get(os.path.splitext(filename)[1].lower(), "")
+
 @cocoindex.op.function()
 def get_symbols(meta: dict) -> list[str]:
     return meta.get("symbols", [])
@@ -85,10 +247,181 @@ def get_symbols(meta: dict) -> list[str]:
 def get_calls(meta: dict) -> list[str]:
     return meta.get("calls", [])
 
+# Persistent chunk-embedding cache, same shape as the AST cache above:
+# embedding is the dominant compute cost of an index run and is pure in the
+# chunk text, so on reindex unchanged chunks skip the forward pass.
+# EMBEDDING_CACHE=1 opts in; it swaps the engine's batched embed op for a
+# per-chunk one, which only pays off when most chunks are cache hits.
+_EMB_CACHE_ENABLED = os.environ.get("EMBEDDING_CACHE", "").lower() in ("1", "true", "yes")
+
+@functools.cache
+def _emb_cache_db():
+    db = sqlite3.connect(
+        os.environ.get("EMBEDDING_CACHE_PATH", "./data/chunk_emb_cache.db"),
+        check_same_thread=False,
+    )
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("CREATE TABLE IF NOT EXISTS chunk_emb (hash BLOB PRIMARY KEY, emb BLOB)")
+    db.commit()
+    return db
+
+
+_emb_write_buffer = {}
+_EMB_FLUSH_SIZE = 1000
+
+
+def _flush_emb_cache():
+    if not _emb_write_buffer:
+        return
+    try:
+        db = _emb_cache_db()
+        db.executemany(
+            "INSERT OR REPLACE INTO chunk_emb (hash, emb) VALUES (?, ?)",
+            list(_emb_write_buffer.items()),
+        )
+        db.commit()
+    except Exception as e:
+        print(f"Embedding cache flush failed: {e}")
+    _emb_write_buffer.clear()
+
+
+atexit.register(_flush_emb_cache)
+
+
+@functools.cache
+def _st_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(
+        os.environ.get("EMBEDDING_MODEL_PATH", "sentence-transformers/all-MiniLM-L6-v2")
+    )
+
+
+# Micro-batcher for cache misses: the engine calls the op once per chunk
+# from many threads, but MiniLM throughput is an order of magnitude higher
+# at batch 32-64 (GEMM utilization). Callers park a Future; whoever arrives
+# first becomes the flusher and encodes everything pending once the batch
+# fills or a 20ms deadline passes.
+_EMB_BATCH_MAX = 64
+_EMB_BATCH_DEADLINE = 0.02
+_emb_batch_lock = threading.Lock()
+_emb_batch_items: "list[tuple[str, Future]]" = []
+
+
+def _batched_encode(text: str) -> np.ndarray:
+    fut = Future()
+    with _emb_batch_lock:
+        _emb_batch_items.append((text, fut))
+        leader = len(_emb_batch_items) == 1
+    if leader:
+        deadline = time.monotonic() + _EMB_BATCH_DEADLINE
+        while time.monotonic() < deadline:
+            with _emb_batch_lock:
+                if len(_emb_batch_items) >= _EMB_BATCH_MAX:
+                    break
+            time.sleep(0.001)
+        with _emb_batch_lock:
+            items, _emb_batch_items[:] = _emb_batch_items[:], []
+        try:
+            vecs = _st_model().encode(
+                [t for t, _ in items], batch_size=_EMB_BATCH_MAX, convert_to_numpy=True
+            )
+        except Exception as e:
+            # Fail every parked caller (the leader's own future included, so
+            # the result() below re-raises); an unresolved future would hang
+            # its engine thread forever.
+            for _, f in items:
+                f.set_exception(e)
+        else:
+            for (_, f), vec in zip(items, vecs):
+                f.set_result(np.asarray(vec, dtype=np.float32))
+    return fut.result()
+
+
+@cocoindex.op.function()
+def cached_embed(text: str) -> NDArray[np.float32]:
+    """Embeds a chunk, consulting the persistent content-hash cache first."""
+    h = xxhash.xxh3_128_digest(text.encode("utf8"))
+    buffered = _emb_write_buffer.get(h)
+    if buffered is not None:
+        return np.frombuffer(buffered, dtype=np.float32).copy()
+    try:
+        row = _emb_cache_db().execute(
+            "SELECT emb FROM chunk_emb WHERE hash = ?", (h,)
+        ).fetchone()
+    except Exception:
+        row = None
+    if row is not None:
+        return np.frombuffer(row[0], dtype=np.float32).copy()
+    vec = _batched_encode(text)
+    _emb_write_buffer[h] = vec.tobytes()
+    if len(_emb_write_buffer) >= _EMB_FLUSH_SIZE:
+        _flush_emb_cache()
+    return vec
+
+
+# Optional int8 ONNX embedding path. Export once with
+#   sentence_transformers.export_dynamic_quantized_onnx_model(model, "O3", path)
+# and point EMBEDDING_ONNX_PATH at the result: dynamic int8 runs ~3-4x faster
+# than FP32 torch on CPU for MiniLM with negligible quality loss. Embedding is
+# the hot path (every chunk at index time, every query at search time).
+_ONNX_MODEL_PATH = os.environ.get("EMBEDDING_ONNX_PATH")
+
+@functools.cache
+def _onnx_session():
+    import onnxruntime
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(
+        os.environ.get("EMBEDDING_MODEL_PATH", "sentence-transformers/all-MiniLM-L6-v2")
+    )
+    session = onnxruntime.InferenceSession(
+        _ONNX_MODEL_PATH, providers=["CPUExecutionProvider"]
+    )
+    return tokenizer, session
+
+
+@cocoindex.op.function()
+def onnx_embed(text: str) -> NDArray[np.float32]:
+    """Embeds text with the quantized ONNX model: mean pool + L2 norm in numpy."""
+    tokenizer, session = _onnx_session()
+    enc = tokenizer(text, truncation=True, max_length=256, return_tensors="np")
+    hidden = session.run(None, dict(enc))[0]
+    mask = enc["attention_mask"][..., None].astype(np.float32)
+    vec = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+    vec /= np.linalg.norm(vec, axis=1, keepdims=True)
+    return vec[0].astype(np.float32)
+
+
+# Model2Vec static embeddings: no transformer stack at all, just a token
+# table lookup + mean pool + L2 norm, roughly 40x faster per chunk. Distill
+# once from the MiniLM model (same 384 dims, so no index schema change) and
+# point EMBEDDING_STATIC_MODEL at it. Worth it on boilerplate-heavy corpora
+# where full-transformer quality is overkill.
+_STATIC_MODEL_PATH = os.environ.get("EMBEDDING_STATIC_MODEL")
+
+@functools.cache
+def _static_model():
+    from model2vec import StaticModel
+    return StaticModel.from_pretrained(_STATIC_MODEL_PATH)
+
+
+@cocoindex.op.function()
+def static_embed(text: str) -> NDArray[np.float32]:
+    """Embeds text with a distilled Model2Vec static model."""
+    vec = np.asarray(_static_model().encode([text])[0], dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
 @cocoindex.transform_flow()
 def code_to_embedding(
     text: cocoindex.DataSlice[str],
 ) -> cocoindex.DataSlice[NDArray[np.float32]]:
+    if _STATIC_MODEL_PATH:
+        return text.transform(static_embed)
+    if _ONNX_MODEL_PATH:
+        return text.transform(onnx_embed)
+    if _EMB_CACHE_ENABLED:
+        return text.transform(cached_embed)
     return text.transform(
         cocoindex.functions.SentenceTransformerEmbed(
             model=os.environ.get("EMBEDDING_MODEL_PATH", "sentence-transformers/all-MiniLM-L6-v2")
@@ -108,7 +441,13 @@ def code_index_flow(
     # Use a stable proxy path that we can swap out via symlink at runtime
     # This allows us to re-point the flow to different repos without rebuilding the graph
     PROXY_PATH = os.path.join(os.getcwd(), "data", "index_proxy")
-    
+
+    # Invariant for the whole flow build; read once instead of per chunk.
+    repo_name = os.environ.get("REPO_NAME", "unknown")
+    branch_name = os.environ.get("BRANCH_NAME", "unknown")
+    index_id = os.environ.get("INDEX_RUN_ID", "unknown")
+    storage_backend = os.environ.get("STORAGE_BACKEND", "postgres")
+
     # Ensure it exists initially so constructor doesn't fail
     if not os.path.exists(PROXY_PATH):
         try:
@@ -126,17 +465,22 @@ def code_index_flow(
                 "**/*.go", "**/*.rb", "**/*.php", "**/*.sh", 
                 "**/*.yaml", "**/*.yml", "**/*.json", "**/*.sql"
             ],
-            excluded_patterns=["**/.git/**", "**/node_modules/**", "**/__pycache__/**", "**/.*"],
+            excluded_patterns=[
+                "**/.git/**", "**/node_modules/**", "**/__pycache__/**", "**/.*",
+                # Generated artifacts: big, churn on every build, and never
+                # what a code search should return — skip the traversal,
+                # chunking and embedding cost outright.
+                "**/package-lock.json", "**/yarn.lock", "**/pnpm-lock.yaml",
+                "**/*.min.js", "**/dist/**", "**/build/**", "**/vendor/**",
+            ],
         )
     )
 
     collector = scope.add_collector()
 
     with scope["files"].row() as f:
-        # Detect language
-        f["language"] = f["filename"].transform(
-            cocoindex.functions.DetectProgrammingLanguage()
-        )
+        # Detect language (extension lookup; see _EXT2LANG)
+        f["language"] = f["filename"].transform(detect_language)
 
         # Chunk content
         f["chunks"] = f["content"].transform(
@@ -156,11 +500,6 @@ def code_index_flow(
             # Generate embedding
             c["embedding"] = c["text"].call(code_to_embedding)
 
-            # Metadata from env
-            repo_name = os.environ.get("REPO_NAME", "unknown")
-            branch_name = os.environ.get("BRANCH_NAME", "unknown")
-            index_id = os.environ.get("INDEX_RUN_ID", "unknown")
-
             collector.collect(
                 filename=f["filename"],
                 language=f["language"],
@@ -177,8 +516,6 @@ def code_index_flow(
             )
 
     # Export to Storage (Postgres or LanceDB)
-    storage_backend = os.environ.get("STORAGE_BACKEND", "postgres")
-    
     if storage_backend == "lancedb":
         # Ensure imports are available
         import cocoindex.targets.lancedb as lancedb_target_module
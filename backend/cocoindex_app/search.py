@@ -1,14 +1,294 @@
 import os
+import re
+import heapq
+import asyncio
+import hashlib
+import sqlite3
 import functools
+from collections import OrderedDict
+import numpy as np
 import cocoindex
 from cocoindex_app.flow import code_index_flow, code_to_embedding
 
-TOP_K = 50
+TOP_K = int(os.environ.get("SEARCH_TOP_K", "50"))
+
+# The backend choice never changes within a process; routes.py reads the
+# same setting once at import for the same reason.
+_STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "postgres")
+
+# HALFVEC_COARSE=1 runs the candidate stage over fp16 (pgvector halfvec via
+# an expression index): half the bytes scanned for the memory-bound ANN
+# traversal, with the fp32 column still used for the final rerank. pgvector
+# has no int8-with-scale type, so fp16 is the densest exact-type option.
+_HALFVEC = os.environ.get("HALFVEC_COARSE", "").lower() in ("1", "true", "yes")
+
+def _configure_conn(conn):
+    # Register the pgvector adapter once per pooled connection; doing it per
+    # query costs type-introspection round trips.
+    from pgvector.psycopg import register_vector
+    register_vector(conn)
+
 
 @functools.cache
 def pool():
     from psycopg_pool import ConnectionPool
-    return ConnectionPool(os.environ["COCOINDEX_DATABASE_URL"])
+    # Shared by search and the StorageManager metadata paths; sized for a
+    # search burst plus status writes from concurrent indexing runs.
+    return ConnectionPool(
+        os.environ["COCOINDEX_DATABASE_URL"],
+        min_size=4,
+        max_size=16,
+        max_idle=60,
+        configure=_configure_conn,
+    )
+
+
+def get_conn():
+    """Checks out a pooled connection (context manager); the single entry
+    point for both search and StorageManager so every physical connection
+    carries the pgvector adapter from the configure hook."""
+    return pool().connection()
+
+
+@functools.cache
+def _table_name() -> str:
+    # Immutable for the process lifetime; resolving it per request walked
+    # the flow spec every time.
+    return cocoindex.utils.get_target_default_name(code_index_flow, "code_embeddings")
+
+
+@functools.cache
+def _search_sql(has_repo: bool, has_branch: bool) -> str:
+    """
+    Search statement per filter shape; cached so the planner can reuse plans.
+
+    Two stages: the inner query is a pure ORDER BY distance LIMIT so the
+    HNSW index serves it, over a candidate pool a few times larger than the
+    final page; the outer query applies the symbol/call array-overlap boosts
+    and re-sorts, so boosting happens before the final LIMIT instead of
+    after it in Python (which could never promote a row the inner LIMIT had
+    already dropped, only reorder survivors).
+    """
+    table_name = _table_name()
+    where = []
+    if has_repo:
+        where.append('"repo" = %(repo)s')
+    if has_branch:
+        where.append('"branch" = %(branch)s')
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+    if _HALFVEC:
+        # Coarse ordering over fp16 (matches the halfvec expression index);
+        # the fp32 distance in the select list is only evaluated for the
+        # candidate rows and feeds the outer rerank.
+        order_expr = '"embedding"::halfvec(384) <=> %(vec)s::vector::halfvec(384)'
+    else:
+        order_expr = "distance"
+    return f"""
+        SELECT *, distance - 0.1 * symbol_hit - 0.05 * call_hit AS boosted
+        FROM (
+            SELECT "filename", "language", "code", "start", "end", "symbols", "calls",
+                   "embedding" <=> %(vec)s AS distance,
+                   ("symbols" && %(terms)s::text[])::int AS symbol_hit,
+                   ("calls" && %(terms)s::text[])::int AS call_hit
+            FROM {table_name} {where_sql}
+            ORDER BY {order_expr}
+            LIMIT %(candidates)s
+        ) candidates
+        ORDER BY boosted
+        LIMIT %(limit)s
+    """
+
+
+def prepare_search_statements():
+    """Builds all four filter-shape variants up front so the first request
+    of each shape doesn't pay the table-name resolution and SQL assembly."""
+    for has_repo in (False, True):
+        for has_branch in (False, True):
+            _search_sql(has_repo, has_branch)
+
+
+def ensure_vector_index():
+    """
+    Makes sure the embedding column has an HNSW index.
+
+    Without it every `<=>` query is a full-table scan — fine at a few
+    thousand rows, seconds at a million. vector_cosine_ops matches the
+    cosine operator the search SQL uses; the vectors are L2-normalized so
+    inner product would be equivalent, but switching operators would also
+    change the distance scale the rerank scoring assumes.
+    """
+    table_name = _table_name()
+    with get_conn() as conn:
+        if _HALFVEC:
+            conn.execute(
+                f'CREATE INDEX IF NOT EXISTS "{table_name}_embedding_halfvec_hnsw" '
+                f'ON {table_name} USING hnsw ((("embedding")::halfvec(384)) halfvec_cosine_ops) '
+                "WITH (m = 16, ef_construction = 64)"
+            )
+        else:
+            conn.execute(
+                f'CREATE INDEX IF NOT EXISTS "{table_name}_embedding_hnsw" '
+                f'ON {table_name} USING hnsw ("embedding" vector_cosine_ops) '
+                "WITH (m = 16, ef_construction = 64)"
+            )
+        # GIN indexes back the symbols/calls && overlap boosts in the
+        # search statement.
+        for col in ("symbols", "calls"):
+            conn.execute(
+                f'CREATE INDEX IF NOT EXISTS "{table_name}_{col}_gin" '
+                f'ON {table_name} USING gin ("{col}")'
+            )
+
+
+@functools.cache
+def async_pool():
+    # Async endpoints should not hold the event loop through a sync
+    # connection; opened once at app startup. For multi-worker uvicorn
+    # deployments put PgBouncer (transaction pooling) in front.
+    from psycopg_pool import AsyncConnectionPool
+    return AsyncConnectionPool(
+        os.environ["COCOINDEX_DATABASE_URL"],
+        min_size=4,
+        max_size=20,
+        max_idle=300,
+        open=False,
+    )
+
+
+# -------------------------------
+# Query embedding memoization
+# -------------------------------
+# Repeated phrasings of the same query shouldn't each pay a model round-trip.
+# Lookup order: in-memory LRU -> sqlite mirror (survives restarts) -> model.
+
+_EMB_CACHE_SIZE = 4096
+_emb_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_ws_re = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    return _ws_re.sub(" ", text.strip().lower())
+
+
+@functools.cache
+def _emb_db():
+    db = sqlite3.connect(
+        os.environ.get("QUERY_EMB_DB_PATH", "./data/query_embeddings.db"),
+        check_same_thread=False,
+    )
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS query_emb (text_hash TEXT PRIMARY KEY, emb BLOB)"
+    )
+    db.commit()
+    return db
+
+
+async def embed_query(text: str):
+    """Embeds a query string, memoizing by normalized text."""
+    key = normalize_query(text)
+    cached = _emb_cache.get(key)
+    if cached is not None:
+        _emb_cache.move_to_end(key)
+        return cached
+
+    text_hash = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    try:
+        row = _emb_db().execute(
+            "SELECT emb FROM query_emb WHERE text_hash = ?", (text_hash,)
+        ).fetchone()
+    except Exception:
+        row = None
+    if row is not None:
+        vec = np.frombuffer(row[0], dtype=np.float32).copy()
+    else:
+        vec = np.asarray(await code_to_embedding.eval_async(text), dtype=np.float32)
+        try:
+            db = _emb_db()
+            db.execute(
+                "INSERT OR REPLACE INTO query_emb (text_hash, emb) VALUES (?, ?)",
+                (text_hash, vec.tobytes()),
+            )
+            db.commit()
+        except Exception as e:
+            print(f"Failed to persist query embedding: {e}")
+
+    _emb_cache[key] = vec
+    if len(_emb_cache) > _EMB_CACHE_SIZE:
+        _emb_cache.popitem(last=False)
+    return vec
+
+
+# Cached LanceDB handle: connect_async + open_table per request costs a
+# filesystem walk and manifest read that the table handle amortizes.
+_lance_tbl = None
+_lance_lock = asyncio.Lock()
+
+
+async def _lance_table():
+    global _lance_tbl
+    if _lance_tbl is None:
+        async with _lance_lock:
+            if _lance_tbl is None:
+                import lancedb
+                uri = os.environ.get("LANCEDB_URI", "./data/lancedb")
+                # Ensure directory exists to avoid error if empty
+                os.makedirs(uri, exist_ok=True)
+                db = await lancedb.connect_async(uri)
+                _lance_tbl = await db.open_table("code_embeddings")
+    return _lance_tbl
+
+
+# Below this many query terms, building a scan database costs more than the
+# per-row set intersections it replaces.
+_HS_MIN_TERMS = 8
+
+
+def _hs_db(query_terms):
+    """Compiles query terms into a Hyperscan literal matcher (None = fall back)."""
+    try:
+        import hyperscan
+    except ImportError:
+        return None
+    try:
+        db = hyperscan.Database()
+        exprs = [re.escape(t).encode() for t in query_terms]
+        db.compile(expressions=exprs, flags=[hyperscan.HS_FLAG_CASELESS] * len(exprs))
+        return db
+    except Exception as e:
+        print(f"Hyperscan compile failed, using set matching: {e}")
+        return None
+
+
+def _hs_scan(db, items):
+    """Returns True/False for a match, or None if the scan itself failed."""
+    import hyperscan
+    try:
+        db.scan(
+            "\n".join(items).encode("utf-8", "replace"),
+            # A non-zero handler return stops at the first hit; hyperscan
+            # surfaces that early termination as ScanTerminated.
+            match_event_handler=lambda *args: 1,
+        )
+    except hyperscan.ScanTerminated:
+        return True
+    except Exception as e:
+        print(f"Hyperscan scan failed, using set matching: {e}")
+        return None
+    return False
+
+
+def _pg_search_rows(sql: str, params: dict, ef_search: int | None):
+    with get_conn() as conn:
+        # binary=True: pgvector columns arrive as raw float32 instead of
+        # text needing a per-element parse.
+        with conn.cursor(binary=True) as cur:
+            if ef_search:
+                # Recall/latency knob for the HNSW index, scoped to this
+                # transaction. SET can't take bound parameters.
+                cur.execute(f"SET LOCAL hnsw.ef_search = {int(ef_search)}")
+            # prepare=True: the plan is built once per connection and reused.
+            cur.execute(sql, params, prepare=True)
+            return cur.fetchall()
 
 
 @code_index_flow.query_handler(
@@ -21,16 +301,21 @@ async def search(
     query: str,
     repo: str | None = None,
     branch: str | None = None,
+    query_vector=None,
+    ef_search: int | None = None,
 ) -> cocoindex.QueryOutput:
 
-    query_vector = await code_to_embedding.eval_async(query)
-    backend = os.environ.get("STORAGE_BACKEND", "postgres")
+    if query_vector is None:
+        query_vector = await embed_query(query)
+    backend = _STORAGE_BACKEND
 
     if backend == "faiss_mongo":
         from memory_service.faiss_store import FAISSStore
-        faiss_store = FAISSStore()
-        # FAISS search
-        raw_results = faiss_store.search(query_vector, k=TOP_K)
+        # Index load and graph traversal both block; keep them off the loop.
+        faiss_store = await asyncio.to_thread(FAISSStore)
+        raw_results = await asyncio.to_thread(
+            faiss_store.search, query_vector, TOP_K, ef_search
+        )
         # Filter by repo/branch if provided
         if repo or branch:
             raw_results = [
@@ -46,15 +331,9 @@ async def search(
                 r["symbols"], r["calls"], 1.0 - r["score"] # Score to distance
             ))
     elif backend == "lancedb":
-        import lancedb
-        uri = os.environ.get("LANCEDB_URI", "./data/lancedb")
-        # Ensure directory exists to avoid error if empty
-        os.makedirs(uri, exist_ok=True)
-        
-        db = await lancedb.connect_async(uri)
         try:
-            tbl = await db.open_table("code_embeddings")
-            
+            tbl = await _lance_table()
+
             query_builder = tbl.vector_search(query_vector).limit(TOP_K)
             
             conditions = []
@@ -85,49 +364,86 @@ async def search(
             rows = []
 
     else:
-        # Postgres Search
-        from pgvector.psycopg import register_vector
-        table_name = cocoindex.utils.get_target_default_name(
-            code_index_flow, "code_embeddings"
-        )
-        where = []
-        params = [query_vector]
+        # Postgres Search: scoring and ordering happen in SQL (see
+        # _search_sql), so rows come back final — no Python rerank pass.
+        params = {
+            "vec": query_vector,
+            "terms": sorted(set(query.lower().split())),
+            "candidates": TOP_K * 4,
+            "limit": TOP_K,
+        }
         if repo:
-            where.append("\"repo\" = %s")
-            params.append(repo)
+            params["repo"] = repo
         if branch:
-            where.append("\"branch\" = %s")
-            params.append(branch)
-
-        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
-        sql = f"""
-            SELECT "filename", "language", "code", "start", "end", "symbols", "calls", "embedding" <=> %s AS distance
-            FROM {table_name} {where_sql} ORDER BY distance LIMIT %s
-        """
-        params.append(TOP_K)
-        with pool().connection() as conn:
-            register_vector(conn)
-            with conn.cursor() as cur:
-                cur.execute(sql, params)
-                rows = cur.fetchall()
+            params["branch"] = branch
+        sql = _search_sql(bool(repo), bool(branch))
+        if ef_search is None and params["terms"]:
+            # Boosting reranks a 4x candidate pool, so the ANN stage needs
+            # enough diversity; 64 beats pgvector's default probe depth of
+            # 40 without a measurable latency hit at this K.
+            ef_search = 64
+        # The sync pool blocks on the DB round trip; run it on a worker
+        # thread so the event loop keeps serving other requests.
+        rows = await asyncio.to_thread(_pg_search_rows, sql, params, ef_search)
+
+        results = []
+        for r in rows:
+            filename, lang, code, start, end, symbols, calls, dist, symbol_hit, call_hit, _boosted = r
+            results.append({
+                "filename": filename,
+                "language": lang,
+                "code": code,
+                "start": start,
+                "end": end,
+                "symbols": symbols,
+                "calls": calls,
+                "score": 1.0 - dist + 0.1 * symbol_hit + 0.05 * call_hit,
+                "structural_boost": bool(symbol_hit or call_hit),
+            })
+        return cocoindex.QueryOutput(
+            query_info=cocoindex.QueryInfo(
+                embedding=query_vector,
+                similarity_metric=cocoindex.VectorSimilarityMetric.COSINE_SIMILARITY,
+            ),
+            results=results,
+        )
 
     results = []
-    query_terms = set(query.lower().split())
+    query_terms = frozenset(query.lower().split())
+    # Many-term queries: one compiled multi-pattern scan over each row's
+    # symbol/call buffer beats N set builds. Optional dep, quietly skipped.
+    hs = _hs_db(query_terms) if len(query_terms) >= _HS_MIN_TERMS else None
 
     for r in rows:
         filename, lang, code, start, end, symbols, calls, dist = r
         score = 1.0 - dist
-        
+
+        # Set intersection: one lowercase pass per row, C-level hashing
+        # instead of a per-term scan over rebuilt lists.
+        if not query_terms:
+            symbol_hit = call_hit = False
+        else:
+            symbol_hit = call_hit = None
+            if hs is not None:
+                symbol_hit = bool(symbols) and _hs_scan(hs, symbols)
+                call_hit = bool(calls) and _hs_scan(hs, calls)
+                if symbol_hit is None or call_hit is None:
+                    # Scan failure: disable hyperscan for the rest of the
+                    # rows and recompute this one via sets below.
+                    hs = None
+            if hs is None:
+                # Symbols/calls are stored lowercased, so no per-row lowering.
+                symbol_hit = bool(symbols) and bool(query_terms & set(symbols))
+                call_hit = bool(calls) and bool(query_terms & set(calls))
+
         structural_match = False
-        if symbols:
-            if any(term in [s.lower() for s in symbols] for term in query_terms):
-                score += 0.1
-                structural_match = True
-        if calls:
-             if any(term in [c.lower() for c in calls] for term in query_terms):
-                score += 0.05
-                structural_match = True
-        
+        if symbol_hit:
+            score += 0.1
+            structural_match = True
+        if call_hit:
+            score += 0.05
+            structural_match = True
+
         results.append({
             "filename": filename,
             "language": lang,
@@ -140,33 +456,51 @@ async def search(
             "structural_boost": structural_match
         })
 
-    results.sort(key=lambda x: x["score"], reverse=True)
+    # Only TOP_K survive; a partial selection beats a full sort.
+    top = heapq.nlargest(TOP_K, results, key=lambda x: x["score"])
     return cocoindex.QueryOutput(
         query_info=cocoindex.QueryInfo(
             embedding=query_vector,
             similarity_metric=cocoindex.VectorSimilarityMetric.COSINE_SIMILARITY,
         ),
-        results=results[:TOP_K],
+        results=top,
     )
 
+async def search_batch(
+    queries: list[str],
+    repo: str | None = None,
+    branch: str | None = None,
+    ef_search: int | None = None,
+) -> list[cocoindex.QueryOutput]:
+    """
+    Runs several queries as one batch; one QueryOutput per query, in order.
+
+    Embedding goes through embed_query so repeats across the batch dedupe
+    against the memo caches, and the per-query searches run concurrently so
+    backend round trips overlap instead of queueing.
+    """
+    vectors = await asyncio.gather(*(embed_query(q) for q in queries))
+    return list(await asyncio.gather(*(
+        search(q, repo=repo, branch=branch, query_vector=v, ef_search=ef_search)
+        for q, v in zip(queries, vectors)
+    )))
+
+
+# Table columns and the result keys they map to, aligned by position.
+_ALL_EMB_COLUMNS = ("embedding", "filename", "location", "start_line", "end_line", "code", "symbols", "calls", "repo", "branch")
+_ALL_EMB_FIELDS = ("embedding", "filename", "location", "start", "end", "text", "symbols", "calls", "repo", "branch")
+
+
 @code_index_flow.query_handler()
-async def get_all_embeddings():
+async def get_all_embeddings(include_embeddings: bool = True):
     """Returns all indexed data from the master Postgres storage."""
-    with pool().connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT embedding, filename, location, start_line, end_line, code, symbols, calls, repo, branch FROM code_embeddings")
-            results = []
-            for row in cur.fetchall():
-                results.append({
-                    "embedding": row[0],
-                    "filename": row[1],
-                    "location": row[2],
-                    "start": row[3],
-                    "end": row[4],
-                    "text": row[5],
-                    "symbols": row[6],
-                    "calls": row[7],
-                    "repo": row[8],
-                    "branch": row[9]
-                })
-            return cocoindex.query_handler.QueryOutput(results=results)
+    columns = _ALL_EMB_COLUMNS if include_embeddings else _ALL_EMB_COLUMNS[1:]
+    fields = _ALL_EMB_FIELDS if include_embeddings else _ALL_EMB_FIELDS[1:]
+    with get_conn() as conn:
+        # Named server-side cursor: rows arrive in itersize batches instead
+        # of one fetchall materializing N x 384 floats client-side at once.
+        with conn.cursor(name="get_all_embeddings", binary=True) as cur:
+            cur.itersize = 1000
+            cur.execute(f"SELECT {', '.join(columns)} FROM {_table_name()}")
+            results = [dict(zip(fields, row)) for row in cur]
+    return cocoindex.query_handler.QueryOutput(results=results)
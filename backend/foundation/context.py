@@ -1,22 +1,125 @@
+import os
+import asyncio
+
+from cachetools import TTLCache
+
 from memory_service.service import MemoryService
 
+# Prefill cost is linear in prompt tokens, so cap how much retrieved code
+# goes into the context. ~4 chars/token is close enough for budgeting.
+MAX_CTX_TOKENS = int(os.environ.get("MAX_CTX_TOKENS", "8000"))
+_BLOCK_OVERHEAD = 120  # chars of header/separator per formatted block
+
+# Formatted-context cache: the same query from a user tends to repeat across
+# a conversation, and the formatted block text is what execute() consumes, so
+# caching post-join skips both the vector search and the re-formatting. The
+# version counter joins every key; reindexing bumps it so stale entries are
+# never served (they just age out of the TTL).
+_context_cache = TTLCache(maxsize=1024, ttl=60)
+_context_version = 0
+
+
+def bump_context_version():
+    """Logically invalidates cached context (called after reindex/reset)."""
+    global _context_version
+    _context_version += 1
+
+
+def _merge_overlapping(rows):
+    """
+    Coalesces overlapping line ranges per file.
+
+    Chunked retrieval often returns near-duplicate snippets from the same
+    file; merging them before budgeting/formatting keeps the duplicated
+    lines from being sent (and billed) twice. Overlap tails are appended by
+    line offset; the merged block keeps the best score and the symbol union.
+    """
+    by_file = {}
+    for r in rows:
+        by_file.setdefault(r["filename"], []).append(r)
+
+    merged = []
+    for rs in by_file.values():
+        rs.sort(key=lambda r: (r["start"], r["end"]))
+        cur = dict(rs[0])
+        for r in rs[1:]:
+            if r["start"] <= cur["end"]:
+                if r["end"] > cur["end"]:
+                    # Append only the lines past the current range's end.
+                    tail = r["code"].splitlines(keepends=True)[cur["end"] - r["start"] + 1:]
+                    cur["code"] = cur["code"].rstrip("\n") + "\n" + "".join(tail)
+                    cur["end"] = r["end"]
+                cur["score"] = max(cur["score"], r["score"])
+                if r.get("symbols"):
+                    cur["symbols"] = sorted(set(cur.get("symbols") or ()) | set(r["symbols"]))
+            else:
+                merged.append(cur)
+                cur = dict(r)
+        merged.append(cur)
+    return merged
+
+
+# Above this many blocks, the format+join runs in a worker thread so a big
+# context doesn't stall the event loop; below it, the thread handoff would
+# cost more than the join itself.
+_FORMAT_OFFLOAD_THRESHOLD = 32
+
+
+def _format_blocks(rows):
+    # One join over a generator: no intermediate blocks list, one pass.
+    return "\n\n".join(
+        f"--- File: {r['filename']} (Relevance Score: {r['score']:.4f}) ---\n"
+        f"Symbols: {', '.join(r['symbols']) if r.get('symbols') else 'None'}\n"
+        f"Lines: {r['start']} to {r['end']}\n"
+        f"{r['code']}\n"
+        for r in rows
+    )
+
 
 class ContextEngine:
     def __init__(self):
         self.mem = MemoryService()
 
     async def resolve(self, tenant, repo, branch, query):
-        results = await self.mem.get_context(tenant, repo, branch, query)
-
-        blocks = []
-        for r in results.results:
-            symbols_str = ", ".join(r['symbols']) if r.get('symbols') else "None"
-            block = (
-                f"--- File: {r['filename']} (Relevance Score: {r['score']:.4f}) ---\n"
-                f"Symbols: {symbols_str}\n"
-                f"Lines: {r['start']} to {r['end']}\n"
-                f"{r['code']}\n"
+        multi = isinstance(query, (list, tuple))
+        key = (tenant, repo, branch, tuple(query) if multi else query, _context_version)
+        cached = _context_cache.get(key)
+        if cached is not None:
+            return cached
+
+        if multi:
+            # Multi-query fan-out (query rewriting / HyDE): retrieve for all
+            # rewrites concurrently, then dedupe the union keeping the best
+            # score per snippet so one chunk never appears twice.
+            all_results = await asyncio.gather(
+                *(self.mem.get_context(tenant, repo, branch, q) for q in query)
             )
-            blocks.append(block)
+            best = {}
+            for res in all_results:
+                for r in res.results:
+                    k = (r["filename"], r["start"], r["end"])
+                    prev = best.get(k)
+                    if prev is None or r["score"] > prev["score"]:
+                        best[k] = r
+            rows = list(best.values())
+        else:
+            rows = (await self.mem.get_context(tenant, repo, branch, query)).results
+
+        # Greedy budget packer: take the best-scored snippets until the
+        # char budget runs out, dropping the low-relevance tail instead of
+        # shipping it to the model. The first snippet always goes in.
+        budget = MAX_CTX_TOKENS * 4
+        used = 0
+        picked = []
+        for r in sorted(_merge_overlapping(rows), key=lambda r: r["score"], reverse=True):
+            used += len(r["code"]) + _BLOCK_OVERHEAD
+            if picked and used > budget:
+                break
+            picked.append(r)
 
-        return "\n\n".join(blocks)
+        if len(picked) > _FORMAT_OFFLOAD_THRESHOLD:
+            text = await asyncio.to_thread(_format_blocks, picked)
+        else:
+            text = _format_blocks(picked)
+        _context_cache[key] = text
+        return text
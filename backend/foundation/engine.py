@@ -1,8 +1,81 @@
+import os
 import uuid
+import asyncio
+import logging
+import functools
 from foundation.context import ContextEngine
 from foundation.constraints import ConstraintEngine
+from foundation.response_cache import ResponseCache
 from foundation.prompts import CODEMIND_PROMPT_TEMPLATE
-import json
+import orjson
+
+# Child of the queue-backed "codemind" logger (api.logging_setup): emitting
+# is a queue.put, so even multi-KB prompt dumps never block the event loop.
+logger = logging.getLogger("codemind.engine")
+if os.environ.get("LOG_LEVEL", "").upper() == "DEBUG":
+    logger.setLevel(logging.DEBUG)
+
+_JSON_CONSTRAINT = "\n\nCRITICAL: Output MUST be valid JSON only. Follow the response contract within the JSON structure."
+
+
+@functools.lru_cache(maxsize=64)
+def _build_system_prompt(role: str, task: str, json_mode: bool) -> str:
+    """
+    Assembles the static part of the prompt for a (role, task, json) combo.
+
+    The template walk below is dozens of joins and f-strings but only varies
+    on these three inputs, so each combination is built once per process;
+    execute() only splices in the per-call context and instruction.
+
+    Ordering invariant: everything rendered here must be static for a given
+    (role, task, json) combo — never interleave per-request values (tenant,
+    repo, branch, retrieved context) into this block. Provider prefix caches
+    invalidate at the first differing token, so request-specific text belongs
+    after this prefix, in the user prompt assembled by execute().
+    """
+    t = CODEMIND_PROMPT_TEMPLATE
+
+    # Identity and Mission
+    system_blocks = [
+        f"{t['system']['identity']}\n{t['system']['mission']}",
+        "\nCore Rules:",
+        "\n".join([f"- {rule}" for rule in t['system']['core_rules']])
+    ]
+
+    # Context Handling
+    system_blocks.append("\nContext Handling Rules:")
+    system_blocks.extend([f"- {rule}" for rule in t['context_handling']['usage_rules']])
+
+    # Role Overlay
+    role_desc = t['role_overlays'].get(role, t['role_overlays']['senior_engineer'])
+    system_blocks.append(f"\nCurrent Role: {role_desc}")
+
+    # Task Prompt
+    task_cfg = t['task_prompts'].get(task, t['task_prompts']['explain_code'])
+    system_blocks.append(f"\nTask Instructions ({task}):")
+    system_blocks.extend([f"- {instr}" for instr in task_cfg['instructions']])
+
+    # Response Contract
+    system_blocks.append("\nResponse Format Requirements:")
+    for section in t['response_contract']['format']:
+        system_blocks.append(f"- {section['section']}: {section['description']}")
+
+    # Safety
+    system_blocks.append("\nHard Constraints:")
+    system_blocks.extend([f"- {c}" for c in t['safety']['hard_constraints']])
+
+    system_prompt = "\n".join(system_blocks)
+
+    if json_mode:
+        system_prompt += _JSON_CONSTRAINT
+
+    return system_prompt
+
+
+# Prewarm the default combo so the first request doesn't pay the template
+# walk; other (role, task, json) combos populate the table on first use.
+_build_system_prompt("senior_engineer", "explain_code", False)
+
 
 class ReasoningEngine:
     def __init__(self, llm, storage_manager=None):
@@ -10,78 +83,50 @@ class ReasoningEngine:
         self.cons = ConstraintEngine()
         self.llm = llm
         self.storage = storage_manager
+        self.response_cache = ResponseCache()
 
     async def execute(self, tenant, repo, branch, instruction, query, constraints, role="senior_engineer", task="explain_code"):
-        # 1. Fetch Context
-        ctx_text = await self.ctx.resolve(tenant, repo, branch, query)
-        
-        # 2. Assemble System Prompt from Template
-        t = CODEMIND_PROMPT_TEMPLATE
-        
-        # Identity and Mission
-        system_blocks = [
-            f"{t['system']['identity']}\n{t['system']['mission']}",
-            "\nCore Rules:",
-            "\n".join([f"- {rule}" for rule in t['system']['core_rules']])
-        ]
-        
-        # Context Handling
-        system_blocks.append("\nContext Handling Rules:")
-        system_blocks.extend([f"- {rule}" for rule in t['context_handling']['usage_rules']])
-        
-        # Role Overlay
-        role_desc = t['role_overlays'].get(role, t['role_overlays']['senior_engineer'])
-        system_blocks.append(f"\nCurrent Role: {role_desc}")
-        
-        # Task Prompt
-        task_cfg = t['task_prompts'].get(task, t['task_prompts']['explain_code'])
-        system_blocks.append(f"\nTask Instructions ({task}):")
-        system_blocks.extend([f"- {instr}" for instr in task_cfg['instructions']])
-        
-        # Response Contract
-        system_blocks.append("\nResponse Format Requirements:")
-        for section in t['response_contract']['format']:
-            system_blocks.append(f"- {section['section']}: {section['description']}")
-            
-        # Safety
-        system_blocks.append("\nHard Constraints:")
-        system_blocks.extend([f"- {c}" for c in t['safety']['hard_constraints']])
-        
-        system_prompt = "\n".join(system_blocks)
-        
-        # 3. Handle Constraints (JSON, etc.)
-        constraint_str = ""
-        if constraints.get("json"):
-            constraint_str = "\n\nCRITICAL: Output MUST be valid JSON only. Follow the response contract within the JSON structure."
-        
-        # 4. Final Prompt Assembly
+        # 1. Fetch Context / 2. Assemble System Prompt
+        # Kick off retrieval first, then render the (cached) system prompt
+        # while it is in flight; on a cold cache the template walk overlaps
+        # the vector-store round-trip instead of serializing behind it.
+        ctx_task = asyncio.ensure_future(self.ctx.resolve(tenant, repo, branch, query))
+        system_prompt = _build_system_prompt(role, task, bool(constraints.get("json")))
+        ctx_text = await ctx_task
+
+        # 3. Final Prompt Assembly
+        # The static system block travels separately so chat drivers send it
+        # as its own system message; providers key their prefix caches on it,
+        # and only the per-request context/instruction below misses the cache.
         prompt = (
-            "=== SYSTEM ===\n"
-            f"{system_prompt}\n\n"
             "=== CONTEXT SNIPPETS (Retrieved from CocoIndex) ===\n"
             f"{ctx_text}\n"
             "--- END OF CONTEXT ---\n\n"
             "=== USER INSTRUCTION ===\n"
-            f"{instruction}\n"
-            f"{constraint_str}"
+            f"{instruction}"
         )
-        
-        # Debug Logging
-        print("\n" + "="*20 + " PROMPT BEGIN " + "="*20)
-        print(prompt)
-        print("="*20 + " PROMPT END " + "="*20 + "\n")
-        
-        # 5. Generate and Enforce
-        out = await self.llm.generate(prompt)
+
+        # Debug Logging (isEnabledFor skips even the arg formatting when off)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("PROMPT:\n%s\n\n%s", system_prompt, prompt)
+
+        # 4. Generate and Enforce
+        # Byte-identical prompts skip the LLM round-trip entirely; enforce
+        # still runs on hits so constraint changes apply to cached output.
+        cache_key = ResponseCache.make_key(system_prompt, prompt)
+        out = self.response_cache.get(cache_key)
+        if out is None:
+            out = await self.llm.generate(prompt, system_prompt=system_prompt)
+            self.response_cache.put(cache_key, out)
         final_response = self.cons.enforce(out, constraints)
 
-        # 6. Log Execution
+        # 5. Log Execution
         if self.storage:
             try:
                 execution_id = str(uuid.uuid4())
                 # Serialize response if it's a dict/object
-                response_str = json.dumps(final_response) if isinstance(final_response, (dict, list)) else str(final_response)
-                
+                response_str = orjson.dumps(final_response).decode() if isinstance(final_response, (dict, list)) else str(final_response)
+
                 self.storage.log_execution(
                     execution_id=execution_id,
                     tenant=tenant,
@@ -1,3 +1,5 @@
+from types import MappingProxyType
+
 CODEMIND_PROMPT_TEMPLATE = {
   "system": {
     "identity": "You are CodeMind, an autonomous software engineering intelligence.",
@@ -111,3 +113,18 @@ CODEMIND_PROMPT_TEMPLATE = {
     "fallback_response": "Based on the available context, this cannot be determined."
   }
 }
+
+
+def _freeze(o):
+    """Recursively turns dicts into read-only views and lists into tuples."""
+    if isinstance(o, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in o.items()})
+    if isinstance(o, list):
+        return tuple(_freeze(x) for x in o)
+    return o
+
+
+# Frozen at import: the template is read on every cold prompt render and
+# must never be mutated at runtime — a read-only view enforces that and
+# makes accidental writes fail loudly instead of poisoning cached prompts.
+CODEMIND_PROMPT_TEMPLATE = _freeze(CODEMIND_PROMPT_TEMPLATE)
@@ -0,0 +1,33 @@
+import hashlib
+from typing import Optional
+from cachetools import TTLCache
+
+
+class ResponseCache:
+    """
+    Exact-match cache for raw LLM completions, keyed by a hash of the final
+    prompt. Sits below the route-level SemanticCache: that layer absorbs
+    paraphrased queries via embedding similarity, this one guarantees that
+    a byte-identical prompt never pays for a second LLM round-trip even when
+    callers reach ReasoningEngine directly.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 600.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        for p in parts:
+            h.update(p.encode("utf-8"))
+            h.update(b"\x00")
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def put(self, key: str, output: str):
+        self._cache[key] = output
+
+    def clear(self):
+        self._cache.clear()
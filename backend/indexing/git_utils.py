@@ -3,10 +3,47 @@ import subprocess
 import uuid
 import re
 
-def clone_repo(repo_url: str, branch: str) -> dict:
+def _refresh_clone_cache(root: str, repo_uuid: str, repo_url: str, branch: str) -> str:
+    """
+    Maintains a shared bare cache per repo_url under {root}/.git-cache/.
+
+    Checkouts clone from this cache — a local, hardlinked, near-instant
+    operation — so only the shallow fetch of new commits ever touches the
+    network, even when the same repo is indexed repeatedly or on several
+    branches. Returns the cache path to clone from.
+    """
+    cache_dir = os.path.join(root, ".git-cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, f"{repo_uuid}.git")
+
+    if os.path.exists(cache_path):
+        # Shallow fetch of just this branch; new branches of a cached repo
+        # land in the same bare store and share its objects.
+        subprocess.check_output(
+            ["git", "fetch", "--depth", "1", "origin",
+             f"+refs/heads/{branch}:refs/heads/{branch}"],
+            cwd=cache_path, stderr=subprocess.STDOUT)
+    else:
+        # No --filter here: a bare clone never checks out, so a blobless
+        # cache would have no blobs to serve and every checkout clone from
+        # it would fail. Shallow alone keeps it one commit deep.
+        subprocess.check_output(
+            ["git", "-c", "pack.threads=0", "clone", "--bare", "--depth", "1",
+             "--single-branch", "--branch", branch,
+             repo_url, cache_path],
+            stderr=subprocess.STDOUT)
+    return cache_path
+
+
+def clone_repo(repo_url: str, branch: str, depth: int = 1) -> dict:
     """
     Clones or updates a git repository.
     Returns metadata including local path and a new run_id.
+
+    Clones are shallow (--depth=1) and partial (--filter=blob:none) by
+    default: indexing only needs the current tree, and skipping history
+    cuts clone time dramatically on large repos. Pass depth=0/None for a
+    full clone (needed if anything wants history, e.g. blame).
     """
     # Ensure CODEBASE_ROOT exists
     root = os.environ.get("CODEBASE_ROOT", "./data/repos")
@@ -36,15 +73,33 @@ def clone_repo(repo_url: str, branch: str) -> dict:
     # (os.path.join handles this mostly, but good to be aware)
 
     try:
+        # Shallow clones go through the shared bare cache; a cache failure
+        # (e.g. read-only data dir) falls back to cloning straight from
+        # origin, same as before.
+        src = repo_url
+        if depth:
+            try:
+                src = _refresh_clone_cache(root, repo_uuid, repo_url, branch)
+            except (subprocess.CalledProcessError, OSError) as e:
+                print(f"Clone cache unavailable ({e}), using origin directly")
+
         if os.path.exists(repo_path):
-            # Pull / Update
+            # Pull / Update. If the checkout's origin is the cache, it was
+            # refreshed above, so this fetch stays local.
             print(f"Updating repo at {repo_path}")
             subprocess.check_output(["git", "fetch", "origin", branch], cwd=repo_path, stderr=subprocess.STDOUT)
-            subprocess.check_output(["git", "reset", "--hard", f"origin/{branch}"], cwd=repo_path, stderr=subprocess.STDOUT)
+            subprocess.check_output(["git", "reset", "--hard", "FETCH_HEAD"], cwd=repo_path, stderr=subprocess.STDOUT)
         else:
             # Clone
-            print(f"Cloning {repo_url} to {repo_path}")
-            subprocess.check_output(["git", "clone", "--branch", branch, "--depth", "1", repo_url, repo_path], stderr=subprocess.STDOUT)
+            print(f"Cloning {src} to {repo_path}")
+            # pack.threads=0 lets index-pack use every core during clone.
+            cmd = ["git", "-c", "pack.threads=0", "clone", "--single-branch", "--branch", branch]
+            if depth and src is repo_url:
+                # Only network clones need to be shallow/partial themselves;
+                # the cache is already shallow and local clones hardlink it.
+                cmd += ["--depth", str(depth), "--filter=blob:none"]
+            cmd += [src, repo_path]
+            subprocess.check_output(cmd, stderr=subprocess.STDOUT)
     except subprocess.CalledProcessError as e:
         error_msg = e.output.decode() if e.output else str(e)
         raise RuntimeError(f"Git operation failed: {error_msg}")
@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 from enum import Enum
 from dataclasses import dataclass
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List
 
 class LLMProvider(Enum):
     OPENAI = "openai"
@@ -24,9 +24,39 @@ class LLMConfig:
 
 class LLMDriver(ABC):
     @abstractmethod
-    async def generate(self, prompt: str, **kwargs) -> str:
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
+        """
+        Generates a completion for `prompt`.
+
+        `system_prompt` carries the static instruction block separately so
+        chat drivers can send it as a dedicated system message. Providers
+        key their prompt/prefix caches on the leading messages, so keeping
+        the stable system block out of the per-request user content lets
+        repeated invocations reuse the cached prefix.
+        """
         pass
 
+    @staticmethod
+    def build_messages(prompt: str, system_prompt: Optional[str] = None) -> List[dict]:
+        """Standard chat payload: optional system message, then the user turn."""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
     @abstractmethod
     def is_available(self) -> bool:
         pass
+
+    async def aclose(self):
+        """Releases pooled resources (shared HTTP clients); no-op by default."""
+        pass
+
+    async def generate_stream(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+        """
+        Yields completion text incrementally. Drivers with server-side
+        streaming override this; the default buffers one full generate()
+        so every driver is streamable from the caller's point of view.
+        """
+        yield await self.generate(prompt, system_prompt=system_prompt, **kwargs)
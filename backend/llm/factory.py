@@ -1,8 +1,18 @@
 import os
 from .base import LLMProvider, LLMConfig
 from .providers import LocalDriver, OllamaDriver, ApigeeDriver, EnterpriseDriver
+from .batching import BatchingDriver
 
 def get_llm_client():
+    driver = _select_driver()
+    # Opt-in request coalescing for bulk workloads (CI sweeps, multi-file
+    # review): concurrent generate() calls within a short window dispatch
+    # together over the driver's shared connection pool.
+    if os.environ.get("LLM_BATCHING") == "1":
+        driver = BatchingDriver(driver)
+    return driver
+
+def _select_driver():
     # Priority order for auto-detection if LLM_PROVIDER is not set
     # 1. Apigee
     # 2. Local (LMStudio)
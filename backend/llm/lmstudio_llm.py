@@ -4,13 +4,13 @@ BASE=os.getenv("LMSTUDIO_BASE_URL","http://localhost:1234/v1")
 MODEL=os.getenv("LMSTUDIO_MODEL","qwen2.5-coder:7b")
 
 class LMStudioLLM:
-    async def generate(self, prompt):
+    async def generate(self, prompt, system_prompt=None):
         try:
             async with httpx.AsyncClient(timeout=60.0) as client:
                 r = await client.post(f"{BASE}/chat/completions", json={
                     "model": MODEL,
                     "messages": [
-                        {"role": "system", "content": "You are a code reasoning engine"},
+                        {"role": "system", "content": system_prompt or "You are a code reasoning engine"},
                         {"role": "user", "content": prompt}
                     ],
                     "temperature": 0.2
@@ -1,6 +1,7 @@
 import os
 import httpx
 import json
+import orjson
 import uuid
 import datetime
 from typing import Optional, Any, Dict
@@ -10,27 +11,63 @@ from .token_manager import ApigeeTokenManager, EnterpriseTokenManager
 class LocalDriver(LLMDriver):
     def __init__(self, config: LLMConfig):
         self.config = config
+        # One client per driver: keep-alive connections and TLS sessions are
+        # reused across generate() calls instead of a fresh pool per request.
+        self._client = httpx.AsyncClient(timeout=config.timeout)
 
-    async def generate(self, prompt: str, **kwargs) -> str:
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
         base_url = self.config.base_url or "http://localhost:1234/v1"
         headers = {"Content-Type": "application/json"}
         if self.config.api_key and self.config.api_key != "not-needed":
             headers["Authorization"] = f"Bearer {self.config.api_key}"
 
-        async with httpx.AsyncClient(timeout=self.config.timeout) as client:
-            response = await client.post(
-                f"{base_url}/chat/completions",
-                headers=headers,
-                json={
-                    "model": self.config.model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": kwargs.get("temperature", self.config.temperature),
-                    "max_tokens": kwargs.get("max_tokens", self.config.max_tokens)
-                }
-            )
+        response = await self._client.post(
+            f"{base_url}/chat/completions",
+            headers=headers,
+            content=orjson.dumps({
+                "model": self.config.model,
+                "messages": self.build_messages(prompt, system_prompt),
+                "temperature": kwargs.get("temperature", self.config.temperature),
+                "max_tokens": kwargs.get("max_tokens", self.config.max_tokens)
+            })
+        )
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        return data["choices"][0]["message"]["content"]
+
+    async def generate_stream(self, prompt: str, system_prompt: Optional[str] = None, **kwargs):
+        base_url = self.config.base_url or "http://localhost:1234/v1"
+        headers = {"Content-Type": "application/json"}
+        if self.config.api_key and self.config.api_key != "not-needed":
+            headers["Authorization"] = f"Bearer {self.config.api_key}"
+
+        async with self._client.stream(
+            "POST",
+            f"{base_url}/chat/completions",
+            headers=headers,
+            json={
+                "model": self.config.model,
+                "messages": self.build_messages(prompt, system_prompt),
+                "temperature": kwargs.get("temperature", self.config.temperature),
+                "max_tokens": kwargs.get("max_tokens", self.config.max_tokens),
+                "stream": True
+            }
+        ) as response:
             response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"]
+            async for line in response.aiter_lines():
+                # OpenAI-style SSE: "data: {...}" frames, "[DONE]" sentinel.
+                if not line.startswith("data:"):
+                    continue
+                frame = line[5:].strip()
+                if not frame or frame == "[DONE]":
+                    continue
+                delta = orjson.loads(frame)["choices"][0].get("delta", {})
+                chunk = delta.get("content")
+                if chunk:
+                    yield chunk
 
     def is_available(self) -> bool:
         return bool(self.config.base_url)
@@ -38,25 +75,29 @@ class LocalDriver(LLMDriver):
 class OllamaDriver(LLMDriver):
     def __init__(self, config: LLMConfig):
         self.config = config
+        self._client = httpx.AsyncClient(timeout=config.timeout)
 
-    async def generate(self, prompt: str, **kwargs) -> str:
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
         base_url = self.config.base_url or "http://localhost:11434"
-        async with httpx.AsyncClient(timeout=self.config.timeout) as client:
-            response = await client.post(
-                f"{base_url}/api/chat",
-                json={
-                    "model": self.config.model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "options": {
-                        "temperature": kwargs.get("temperature", self.config.temperature),
-                        "num_predict": kwargs.get("max_tokens", self.config.max_tokens)
-                    },
-                    "stream": False
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data["message"]["content"]
+        response = await self._client.post(
+            f"{base_url}/api/chat",
+            headers={"Content-Type": "application/json"},
+            content=orjson.dumps({
+                "model": self.config.model,
+                "messages": self.build_messages(prompt, system_prompt),
+                "options": {
+                    "temperature": kwargs.get("temperature", self.config.temperature),
+                    "num_predict": kwargs.get("max_tokens", self.config.max_tokens)
+                },
+                "stream": False
+            })
+        )
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        return data["message"]["content"]
 
     def is_available(self) -> bool:
         return bool(self.config.base_url)
@@ -65,10 +106,15 @@ class ApigeeDriver(LLMDriver):
     def __init__(self, config: LLMConfig):
         self.config = config
         self.token_manager = ApigeeTokenManager()
+        # Apigee gateway uses an internal CA, hence verify=False (as before).
+        self._client = httpx.AsyncClient(timeout=config.timeout, verify=False)
+
+    async def aclose(self):
+        await self._client.aclose()
 
-    async def generate(self, prompt: str, **kwargs) -> str:
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
         token = await self.token_manager.get_token()
-        
+
         enterprise_base_url = os.environ.get("ENTERPRISE_BASE_URL")
         wf_use_case_id = os.environ.get("WF_USE_CASE_ID")
         wf_client_id = os.environ.get("WF_CLIENT_ID")
@@ -88,37 +134,35 @@ class ApigeeDriver(LLMDriver):
             "Content-Type": "application/json"
         }
 
-        async with httpx.AsyncClient(timeout=self.config.timeout, verify=False) as client:
-            response = await client.post(
+        # Serialize once; the 401 retry reuses the same bytes instead of
+        # having httpx re-encode the (potentially tens-of-KB) body.
+        body = orjson.dumps({
+            "model": self.config.model,
+            "messages": self.build_messages(prompt, system_prompt),
+            "temperature": kwargs.get("temperature", self.config.temperature),
+            "max_tokens": kwargs.get("max_tokens", self.config.max_tokens)
+        })
+
+        response = await self._client.post(
+            f"{enterprise_base_url}/v1/chat/completions",
+            headers=headers,
+            content=body
+        )
+
+        if response.status_code == 401:
+            # Retry once after clearing token; only the auth header changes.
+            self.token_manager.clear_token()
+            token = await self.token_manager.get_token()
+            headers["Authorization"] = f"Bearer {token}"
+            response = await self._client.post(
                 f"{enterprise_base_url}/v1/chat/completions",
                 headers=headers,
-                json={
-                    "model": self.config.model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": kwargs.get("temperature", self.config.temperature),
-                    "max_tokens": kwargs.get("max_tokens", self.config.max_tokens)
-                }
+                content=body
             )
-            
-            if response.status_code == 401:
-                # Retry once after clearing token
-                self.token_manager.clear_token()
-                token = await self.token_manager.get_token()
-                headers["Authorization"] = f"Bearer {token}"
-                response = await client.post(
-                    f"{enterprise_base_url}/v1/chat/completions",
-                    headers=headers,
-                    json={
-                        "model": self.config.model,
-                        "messages": [{"role": "user", "content": prompt}],
-                        "temperature": kwargs.get("temperature", self.config.temperature),
-                        "max_tokens": kwargs.get("max_tokens", self.config.max_tokens)
-                    }
-                )
 
-            response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"]
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        return data["choices"][0]["message"]["content"]
 
     def is_available(self) -> bool:
         required_vars = [
@@ -129,8 +173,12 @@ class EnterpriseDriver(LLMDriver):
     def __init__(self, config: LLMConfig):
         self.config = config
         self.token_manager = EnterpriseTokenManager()
+        self._client = httpx.AsyncClient(timeout=config.timeout)
 
-    async def generate(self, prompt: str, **kwargs) -> str:
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
         token = await self.token_manager.get_token()
         if not self.config.base_url:
             raise ValueError("Enterprise base URL not provided")
@@ -148,21 +196,22 @@ class EnterpriseDriver(LLMDriver):
         except:
             pass
 
-        async with httpx.AsyncClient(timeout=self.config.timeout) as client:
-            response = await client.post(
-                self.config.base_url,
-                headers=headers,
-                json={
-                    "model": self.config.model,
-                    "prompt": prompt, # Enterprise often uses 'prompt' instead of messages
-                    "temperature": kwargs.get("temperature", self.config.temperature),
-                    "max_tokens": kwargs.get("max_tokens", self.config.max_tokens)
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
-            # Handle variations in response format
-            return data.get("response") or data.get("choices", [{}])[0].get("message", {}).get("content") or data.get("content") or ""
+        response = await self._client.post(
+            self.config.base_url,
+            headers=headers,
+            content=orjson.dumps({
+                "model": self.config.model,
+                # Enterprise often uses a flat 'prompt' instead of messages;
+                # the system block goes in front so it stays a stable prefix.
+                "prompt": f"{system_prompt}\n\n{prompt}" if system_prompt else prompt,
+                "temperature": kwargs.get("temperature", self.config.temperature),
+                "max_tokens": kwargs.get("max_tokens", self.config.max_tokens)
+            })
+        )
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        # Handle variations in response format
+        return data.get("response") or data.get("choices", [{}])[0].get("message", {}).get("content") or data.get("content") or ""
 
     def is_available(self) -> bool:
         return bool(os.environ.get("ENTERPRISE_LLM_TOKEN") and self.config.base_url)
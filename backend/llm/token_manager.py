@@ -2,27 +2,44 @@ import os
 import httpx
 import base64
 import time
-from datetime import datetime, timedelta
+import asyncio
 from typing import Optional
 
+# One shared client: OAuth fetches reuse the same TLS connection instead of
+# paying a handshake per refresh. verify=False follows the original TS logic
+# (NODE_TLS_REJECT_UNAUTHORIZED='0'); tighten when certs are sorted out.
+_http = httpx.AsyncClient(verify=False, timeout=10.0)
+
+# Refresh a little before the hour is up so in-flight requests never race an
+# expiring token.
+REFRESH_MARGIN = 60
+TOKEN_TTL = 3600
+
+
 class ApigeeTokenManager:
     def __init__(self):
         self.token: Optional[str] = None
-        self.token_expiry: Optional[datetime] = None
+        # time.monotonic() deadline: immune to wallclock jumps (NTP, DST)
+        # that datetime.now() comparisons inherit.
+        self._expiry_mono: float = 0.0
+        self._refresh_lock = asyncio.Lock()
 
     async def get_token(self) -> str:
-        # Check if we have a valid cached token
-        if self.token and self.token_expiry and datetime.now() < self.token_expiry:
+        if self.token and time.monotonic() < self._expiry_mono - REFRESH_MARGIN:
             return self.token
 
-        # Fetch new token
-        token = await self._fetch_token()
-        
-        # Cache the token (assuming 1 hour expiry as per TS logic)
-        self.token = token
-        self.token_expiry = datetime.now() + timedelta(hours=1)
-        
-        return self.token
+        # Single-flight the refresh: concurrent callers wait for one fetch
+        # instead of hammering the OAuth endpoint in a herd.
+        async with self._refresh_lock:
+            if self.token and time.monotonic() < self._expiry_mono - REFRESH_MARGIN:
+                return self.token
+
+            token = await self._fetch_token()
+
+            # Cache the token (assuming 1 hour expiry as per TS logic)
+            self.token = token
+            self._expiry_mono = time.monotonic() + TOKEN_TTL
+            return self.token
 
     async def _fetch_token(self) -> str:
         login_url = os.environ.get("APIGEE_NONPROD_LOGIN_URL")
@@ -36,29 +53,26 @@ class ApigeeTokenManager:
             # Prepare OAuth 2.0 client credentials request
             auth_str = f"{consumer_key}:{consumer_secret}"
             base64_auth = base64.b64encode(auth_str.encode()).decode()
-            
-            # Note: TS logic had NODE_TLS_REJECT_UNAUTHORIZED='0', we use verify=False if needed, 
-            # but better to handle it properly. For now following the spirit of the provided logic.
-            async with httpx.AsyncClient(verify=False) as client:
-                response = await client.post(
-                    login_url,
-                    headers={
-                        "Authorization": f"Basic {base64_auth}",
-                        "Content-Type": "application/x-www-form-urlencoded"
-                    },
-                    data={"grant_type": "client_credentials"}
-                )
-
-                if response.status_code != 200:
-                    raise Exception(f"Apigee OAuth failed: {response.status_code} - {response.text}")
-
-                token_data = response.json()
-                access_token = token_data.get("access_token")
-                
-                if not access_token:
-                    raise Exception("No access_token received from Apigee OAuth")
-
-                return access_token
+
+            response = await _http.post(
+                login_url,
+                headers={
+                    "Authorization": f"Basic {base64_auth}",
+                    "Content-Type": "application/x-www-form-urlencoded"
+                },
+                data={"grant_type": "client_credentials"}
+            )
+
+            if response.status_code != 200:
+                raise Exception(f"Apigee OAuth failed: {response.status_code} - {response.text}")
+
+            token_data = response.json()
+            access_token = token_data.get("access_token")
+
+            if not access_token:
+                raise Exception("No access_token received from Apigee OAuth")
+
+            return access_token
 
         except Exception as e:
             print(f"Apigee token fetch failed: {e}")
@@ -67,10 +81,10 @@ class ApigeeTokenManager:
 class EnterpriseTokenManager:
     def __init__(self):
         self.token: Optional[str] = None
-        self.token_expiry: Optional[datetime] = None
+        self._expiry_mono: float = 0.0
 
     async def get_token(self) -> str:
-        if self.token and self.token_expiry and datetime.now() < self.token_expiry:
+        if self.token and time.monotonic() < self._expiry_mono - REFRESH_MARGIN:
             return self.token
 
         token = os.environ.get("ENTERPRISE_LLM_TOKEN")
@@ -78,9 +92,9 @@ class EnterpriseTokenManager:
             raise ValueError("ENTERPRISE_LLM_TOKEN environment variable not set")
 
         self.token = token
-        self.token_expiry = datetime.now() + timedelta(hours=1)
+        self._expiry_mono = time.monotonic() + TOKEN_TTL
         return self.token
 
     def clear_token(self):
         self.token = None
-        self.token_expiry = None
+        self._expiry_mono = 0.0
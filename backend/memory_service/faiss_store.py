@@ -1,59 +1,167 @@
 import os
 import faiss
 import numpy as np
-import pickle
+import msgpack
 
 class FAISSStore:
     def __init__(self):
         self.index_path = os.environ.get("FAISS_INDEX_PATH", "./data/faiss_index")
         self.dimension = 384 # MiniLM-L6 dimension
+        # QUANTIZATION: none (fp32), int8 (scalar quantizer, 4x smaller),
+        # binary (sign bits + Hamming, 32x smaller, lowest recall).
+        self.quantization = os.environ.get("QUANTIZATION", "none")
         self.index = None
-        self.metadata = [] # List of dicts to store text and other fields
-        
+        # Metadata is stored column-wise (field -> list, parallel to index
+        # rows) instead of a list of dicts: search assembles a result dict
+        # per hit without copying a stored one, and a repo/branch filter
+        # scans one contiguous list instead of hopping between dicts.
+        self._meta_cols = {}
+        self._meta_len = 0
+        # Reusable single-query buffer: avoids a reshape + allocation per
+        # search and keeps normalization off the caller's array.
+        self._qbuf = np.empty((1, self.dimension), dtype=np.float32)
+
         if os.path.exists(self.index_path):
             self.load()
         else:
-            self.index = faiss.IndexFlatIP(self.dimension) # Inner Product == Cosine Similarity for normalized vectors
+            self.index = self._new_index()
+
+    def _new_index(self):
+        if self.quantization == "binary":
+            # Sign-binarized vectors compared by Hamming distance (popcount).
+            return faiss.IndexBinaryFlat(self.dimension)
+        if self.quantization == "int8":
+            # Scalar int8 quantization: 4x smaller, needs a train() pass.
+            return faiss.IndexScalarQuantizer(
+                self.dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+        # Default: HNSW graph over inner product (== cosine for normalized
+        # vectors). Sublinear search vs the old IndexFlatIP full scan, which
+        # got slow past a few tens of thousands of vectors.
+        # FAISS_INDEX_KIND=ivfpq trades some recall for ~8x less memory per
+        # vector (product quantization) — useful past ~1M chunks.
+        kind = os.environ.get("FAISS_INDEX_KIND", "hnsw")
+        if kind == "ivfpq":
+            index = faiss.index_factory(
+                self.dimension, "IVF4096,PQ48", faiss.METRIC_INNER_PRODUCT
+            )
+            index.nprobe = 16
+            return index
+        index = faiss.IndexHNSWFlat(self.dimension, 32, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = 200
+        index.hnsw.efSearch = 64
+        return index
+
+    def _binarize(self, vecs: np.ndarray) -> np.ndarray:
+        return np.packbits((vecs > 0).astype(np.uint8), axis=1)
 
     def add(self, embeddings: np.ndarray, metadata: list):
-        # Ensure embeddings are normalized for cosine similarity if using IndexFlatIP
-        faiss.normalize_L2(embeddings)
-        self.index.add(embeddings)
-        self.metadata.extend(metadata)
+        if self.quantization == "binary":
+            self.index.add(self._binarize(embeddings))
+        else:
+            # Normalize so inner product == cosine similarity
+            faiss.normalize_L2(embeddings)
+            if not self.index.is_trained:
+                # IVF-PQ / int8 need a training pass; the full batch is a fine sample.
+                self.index.train(embeddings)
+            self.index.add(embeddings)
+        self._append_rows(metadata)
 
-    def search(self, query_vector: np.ndarray, k: int = 5):
+    def _append_rows(self, rows: list):
+        for row in rows:
+            # Rows may carry different keys; backfill new columns with None.
+            for key in row.keys() - self._meta_cols.keys():
+                self._meta_cols[key] = [None] * self._meta_len
+            for key, col in self._meta_cols.items():
+                col.append(row.get(key))
+            self._meta_len += 1
+
+    def search(self, query_vector: np.ndarray, k: int = 5, ef_search: int = None):
         if self.index.ntotal == 0:
             return []
-        
-        faiss.normalize_L2(query_vector.reshape(1, -1))
-        distances, indices = self.index.search(query_vector.reshape(1, -1), k)
-        
+        if ef_search and hasattr(self.index, "hnsw"):
+            # Query-time recall/latency knob; higher = better recall, slower.
+            self.index.hnsw.efSearch = ef_search
+
+        if self.quantization == "binary":
+            q = self._binarize(np.asarray(query_vector, dtype=np.float32).reshape(1, -1))
+            distances, indices = self.index.search(q, k)
+            # Hamming distance -> similarity in [0, 1] to match the IP scale.
+            return self._row_results(1.0 - distances[0] / float(self.dimension), indices[0])
+
+        self._qbuf[0] = query_vector
+        faiss.normalize_L2(self._qbuf)
+        distances, indices = self.index.search(self._qbuf, k)
+        return self._row_results(distances[0], indices[0])
+
+    def search_batch(self, query_vectors: np.ndarray, k: int = 5, ef_search: int = None):
+        """Searches N query vectors in a single FAISS call; one result list per query."""
+        qv = np.array(query_vectors, dtype=np.float32, copy=True).reshape(-1, self.dimension)
+        if self.index.ntotal == 0:
+            return [[] for _ in range(qv.shape[0])]
+        if ef_search and hasattr(self.index, "hnsw"):
+            self.index.hnsw.efSearch = ef_search
+
+        if self.quantization == "binary":
+            distances, indices = self.index.search(self._binarize(qv), k)
+            return [
+                self._row_results(1.0 - distances[i] / float(self.dimension), indices[i])
+                for i in range(qv.shape[0])
+            ]
+
+        faiss.normalize_L2(qv)
+        distances, indices = self.index.search(qv, k)
+        return [self._row_results(distances[i], indices[i]) for i in range(qv.shape[0])]
+
+    def _row_results(self, dist_row, idx_row):
         results = []
-        for i, idx in enumerate(indices[0]):
+        cols = self._meta_cols.items()
+        for i, idx in enumerate(idx_row):
             if idx == -1: continue
-            res = self.metadata[idx].copy()
-            res["score"] = float(distances[0][i])
+            res = {key: col[idx] for key, col in cols}
+            res["score"] = float(dist_row[i])
             results.append(res)
         return results
 
     def save(self):
         os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
-        faiss.write_index(self.index, self.index_path + ".index")
+        if self.quantization == "binary":
+            faiss.write_index_binary(self.index, self.index_path + ".index")
+        else:
+            faiss.write_index(self.index, self.index_path + ".index")
         with open(self.index_path + ".meta", "wb") as f:
-            pickle.dump(self.metadata, f)
+            # msgpack: several times faster than pickle on a big metadata list
+            # and no arbitrary-code-execution surface on load.
+            f.write(msgpack.packb(
+                {"len": self._meta_len, "cols": self._meta_cols},
+                use_bin_type=True,
+            ))
 
     def load(self):
         if os.path.exists(self.index_path + ".index"):
-            self.index = faiss.read_index(self.index_path + ".index")
+            if self.quantization == "binary":
+                self.index = faiss.read_index_binary(self.index_path + ".index")
+            else:
+                self.index = faiss.read_index(self.index_path + ".index")
             with open(self.index_path + ".meta", "rb") as f:
-                self.metadata = pickle.load(f)
+                stored = msgpack.unpackb(f.read(), raw=False)
+            if isinstance(stored, list):
+                # Row-wise format from before the columnar layout.
+                self._meta_cols = {}
+                self._meta_len = 0
+                self._append_rows(stored)
+            else:
+                self._meta_cols = stored["cols"]
+                self._meta_len = stored["len"]
         else:
-            self.index = faiss.IndexFlatIP(self.dimension)
-            self.metadata = []
+            self.index = self._new_index()
+            self._meta_cols = {}
+            self._meta_len = 0
 
     def reset(self):
-        self.index = faiss.IndexFlatIP(self.dimension)
-        self.metadata = []
+        self.index = self._new_index()
+        self._meta_cols = {}
+        self._meta_len = 0
         if os.path.exists(self.index_path + ".index"):
             os.remove(self.index_path + ".index")
         if os.path.exists(self.index_path + ".meta"):
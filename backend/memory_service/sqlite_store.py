@@ -1,21 +1,72 @@
 import sqlite3
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 import json
+from cachetools import TTLCache
+
+# URL -> display name; the same handful of URLs recur across rows and polls.
+_repo_names: dict = {}
+
+
+def _repo_display_name(url):
+    name = _repo_names.get(url)
+    if name is None:
+        name = url.split("/")[-1].replace(".git", "") if url else "unknown"
+        _repo_names[url] = name
+    return name
+
 
 class SqliteStore:
     def __init__(self):
         self.db_path = os.environ.get("SQLITE_DB_PATH", "codemind.db")
+        # One persistent connection per thread: opening per call threw away
+        # the page cache (and the WAL frame cache) every time. Threads never
+        # share a connection, so no cross-thread locking is needed — WAL
+        # plus busy_timeout handles writer overlap between threads.
+        self._local = threading.local()
+        # Bumped by reset() so stale per-thread connections to the deleted
+        # file get reopened lazily.
+        self._generation = 0
+        # Dashboard reads get a short TTL cache; the write epoch is part of
+        # every key, so any status write logically invalidates without a
+        # purge (stale entries just age out of the TTL).
+        self._read_cache = TTLCache(maxsize=32, ttl=60)
+        self._write_epoch = 0
         self._init_db()
 
-    def _get_conn(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "generation", -1) != self._generation:
+            if conn is not None:
+                conn.close()
+            # PARSE_DECLTYPES: TIMESTAMP columns come back as datetime
+            # instead of raw strings, so readers don't need a per-row
+            # isinstance branch before formatting.
+            conn = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+            conn.row_factory = sqlite3.Row
+            # Absorb transient WAL write contention instead of raising
+            # "database is locked" immediately.
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            self._local.generation = self._generation
         return conn
 
     def _init_db(self):
-        conn = self._get_conn()
+        conn = self._conn()
         cursor = conn.cursor()
+        if self.db_path != ":memory:":
+            # WAL lets readers proceed during a write and batches fsyncs;
+            # it persists in the DB file so setting it here at init is
+            # enough. synchronous=NORMAL is safe with WAL (no torn pages,
+            # at most the last transactions lost on power cut) and skips
+            # an fsync per commit.
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA cache_size=-64000")  # 64MB page cache
+            cursor.execute("PRAGMA mmap_size=268435456")  # 256MB
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS indexing_status (
                 index_id TEXT PRIMARY KEY,
@@ -27,13 +78,13 @@ class SqliteStore:
                 created_at TIMESTAMP
             )
         """)
-        
+
         # Simple migration for existing DBs
         try:
             cursor.execute("ALTER TABLE indexing_status ADD COLUMN namespace TEXT DEFAULT 'default'")
         except sqlite3.OperationalError:
             pass
-            
+
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS executions (
                 execution_id TEXT PRIMARY KEY,
@@ -44,161 +95,205 @@ class SqliteStore:
                 created_at TIMESTAMP
             )
         """)
+        # Backs the per-(repo, branch, namespace) latest-run window scan in
+        # get_indexed_repos.
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_status_repo_branch_ns_ts
+            ON indexing_status(repo_url, branch, namespace, created_at DESC)
+        """)
+        # get_activity orders the whole table by recency; get_live_pipelines
+        # and get_counts filter on a handful of statuses (partial index keeps
+        # it small); get_executions pages per repo by recency.
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_status_created
+            ON indexing_status(created_at DESC)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_status_status
+            ON indexing_status(status)
+            WHERE status IN ('started', 'pending', 'completed')
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_exec_repo_created
+            ON executions(repo, created_at DESC)
+        """)
         conn.commit()
-        conn.close()
 
-    def create_status(self, index_id: str, repo_url: str, branch: str, namespace: str = "default"):
-        conn = self._get_conn()
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO indexing_status (index_id, repo_url, branch, status, created_at, namespace) VALUES (?, ?, ?, ?, ?, ?)",
-            (index_id, repo_url, branch, "started", datetime.utcnow(), namespace)
-        )
+    @contextmanager
+    def _write_tx(self):
+        """
+        Wraps writes in BEGIN IMMEDIATE ... COMMIT.
+
+        Taking the write lock up front (instead of on first write) avoids
+        the upgrade deadlock under WAL, and grouping statements into one
+        explicit transaction means one fsync per block rather than one per
+        statement in autocommit mode.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
         conn.commit()
-        conn.close()
 
-    def update_status(self, index_id: str, status: str, error: str = None):
-        conn = self._get_conn()
-        cursor = conn.cursor()
-        if error:
-            cursor.execute(
-                "UPDATE indexing_status SET status = ?, error = ? WHERE index_id = ?",
-                (status, error, index_id)
-            )
-        else:
-            cursor.execute(
-                "UPDATE indexing_status SET status = ? WHERE index_id = ?",
-                (status, index_id)
+    def create_status(self, index_id: str, repo_url: str, branch: str, namespace: str = "default"):
+        self._write_epoch += 1
+        with self._write_tx() as conn:
+            conn.execute(
+                "INSERT INTO indexing_status (index_id, repo_url, branch, status, created_at, namespace) VALUES (?, ?, ?, ?, ?, ?)",
+                (index_id, repo_url, branch, "started", datetime.utcnow(), namespace)
             )
-        conn.commit()
-        conn.close()
+
+    def update_status(self, index_id: str, status: str, error: str = None):
+        self._write_epoch += 1
+        with self._write_tx() as conn:
+            if error:
+                conn.execute(
+                    "UPDATE indexing_status SET status = ?, error = ? WHERE index_id = ?",
+                    (status, error, index_id)
+                )
+            else:
+                conn.execute(
+                    "UPDATE indexing_status SET status = ? WHERE index_id = ?",
+                    (status, index_id)
+                )
 
     def get_status(self, index_id: str):
-        conn = self._get_conn()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM indexing_status WHERE index_id = ?", (index_id,))
+        cursor = self._conn().execute(
+            "SELECT * FROM indexing_status WHERE index_id = ?", (index_id,)
+        )
         row = cursor.fetchone()
-        conn.close()
-        
+
         if row:
             # Convert row to dict to match Mongo behavior
             return dict(row)
         return None
 
     def log_execution(self, execution_id: str, tenant: str, repo: str, instruction: str, response: str):
-        conn = self._get_conn()
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO executions (execution_id, tenant, repo, instruction, response, created_at) VALUES (?, ?, ?, ?, ?, ?)",
-            (execution_id, tenant, repo, instruction, response, datetime.utcnow())
-        )
-        conn.commit()
-        conn.close()
+        with self._write_tx() as conn:
+            conn.execute(
+                "INSERT INTO executions (execution_id, tenant, repo, instruction, response, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (execution_id, tenant, repo, instruction, response, datetime.utcnow())
+            )
+
+    def bulk_log_executions(self, rows: list):
+        """Inserts many execution rows under a single transaction (one fsync)."""
+        now = datetime.utcnow()
+        with self._write_tx() as conn:
+            conn.executemany(
+                "INSERT INTO executions (execution_id, tenant, repo, instruction, response, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (r["execution_id"], r["tenant"], r["repo"], r["instruction"],
+                     r["response"], r.get("created_at", now))
+                    for r in rows
+                ],
+            )
 
     def get_executions(self, repo: str = None, limit: int = 50):
-        # ... existing ...
-        conn = self._get_conn()
-        cursor = conn.cursor()
+        conn = self._conn()
         if repo:
-            cursor.execute("SELECT * FROM executions WHERE repo = ? ORDER BY created_at DESC LIMIT ?", (repo, limit))
+            cursor = conn.execute("SELECT * FROM executions WHERE repo = ? ORDER BY created_at DESC LIMIT ?", (repo, limit))
         else:
-            cursor.execute("SELECT * FROM executions ORDER BY created_at DESC LIMIT ?", (limit,))
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+            cursor = conn.execute("SELECT * FROM executions ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [dict(row) for row in cursor.fetchall()]
 
     def get_activity(self, limit: int = 50):
-        conn = self._get_conn()
-        cursor = conn.cursor()
-        cursor.execute("""
+        key = ("activity", limit, self._write_epoch)
+        cached = self._read_cache.get(key)
+        if cached is not None:
+            return cached
+        cursor = self._conn().execute("""
             SELECT namespace, repo_url, branch, status, created_at, index_id, error
-            FROM indexing_status 
-            ORDER BY created_at DESC 
+            FROM indexing_status
+            ORDER BY created_at DESC
             LIMIT ?
         """, (limit,))
         rows = cursor.fetchall()
-        conn.close()
-        
+
         activity = []
         for row in rows:
             r = dict(row)
             created_at = r["created_at"]
-            if isinstance(created_at, datetime):
-                date_str = created_at.isoformat()
-            else:
-                date_str = str(created_at)
-                
             activity.append({
                 "repo": r["repo_url"],
                 "repo_url": r["repo_url"],
                 "branch": r["branch"],
                 "status": r["status"],
-                "date": date_str,
+                "date": created_at.isoformat() if created_at else None,
                 "index_id": r["index_id"],
                 "error": r["error"],
                 "namespace": r["namespace"]
             })
+        self._read_cache[key] = activity
         return activity
 
     def get_live_pipelines(self):
-        conn = self._get_conn()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT index_id, repo_url, branch, status, created_at, namespace 
-            FROM indexing_status 
+        cursor = self._conn().execute("""
+            SELECT index_id, repo_url, branch, status, created_at, namespace
+            FROM indexing_status
             WHERE status = 'started' OR status = 'pending'
             ORDER BY created_at DESC
         """)
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+        return [dict(row) for row in cursor.fetchall()]
 
     def get_indexed_repos(self):
-        conn = self._get_conn()
-        cursor = conn.cursor()
-        # Emulate DISTINCT ON logic using groupwise max
-        cursor.execute("""
-            SELECT t1.repo_url, t1.branch, t1.namespace, t1.status, t1.created_at
-            FROM indexing_status t1
-            WHERE t1.created_at = (
-                SELECT MAX(t2.created_at) 
-                FROM indexing_status t2 
-                WHERE t2.repo_url = t1.repo_url AND t2.branch = t1.branch AND t2.namespace = t1.namespace
+        key = ("repos", self._write_epoch)
+        cached = self._read_cache.get(key)
+        if cached is not None:
+            return cached
+        # Emulate DISTINCT ON with a window function: one sorted pass over
+        # the table instead of a correlated MAX subquery per row (O(N^2)).
+        cursor = self._conn().execute("""
+            SELECT repo_url, branch, namespace, status, created_at FROM (
+                SELECT repo_url, branch, namespace, status, created_at,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY repo_url, branch, namespace
+                           ORDER BY created_at DESC
+                       ) AS rn
+                FROM indexing_status
             )
-            ORDER BY t1.namespace, t1.repo_url, t1.branch
+            WHERE rn = 1
+            ORDER BY namespace, repo_url, branch
         """)
         rows = cursor.fetchall()
-        conn.close()
         repos = []
         for row in rows:
             r = dict(row)
             url = r["repo_url"]
-            name = url.split("/")[-1].replace(".git", "") if url else "unknown"
-            
             repos.append({
-                "name": name,
+                "name": _repo_display_name(url),
                 "url": url,
                 "branch": r["branch"],
                 "status": r["status"],
                 "last_updated": str(r["created_at"]) if r["created_at"] else None
             })
+        self._read_cache[key] = repos
         return repos
 
     def get_counts(self):
-        conn = self._get_conn()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(DISTINCT repo_url) FROM indexing_status WHERE status = 'completed'")
-        res_indexed = cursor.fetchone()
-        indexed = res_indexed[0] if res_indexed else 0
-        
-        cursor.execute("SELECT COUNT(*) FROM indexing_status WHERE status = 'completed'")
-        res_runs = cursor.fetchone()
-        runs = res_runs[0] if res_runs else 0
-        
-        conn.close()
-        return {"indexed_repos": indexed, "success_runs": runs}
+        key = ("counts", self._write_epoch)
+        cached = self._read_cache.get(key)
+        if cached is not None:
+            return cached
+        # Both counts share the same filter; one scan instead of two.
+        row = self._conn().execute(
+            "SELECT COUNT(DISTINCT repo_url), COUNT(*) FROM indexing_status WHERE status = 'completed'"
+        ).fetchone()
+        indexed, runs = (row[0], row[1]) if row else (0, 0)
+        counts = {"indexed_repos": indexed, "success_runs": runs}
+        self._read_cache[key] = counts
+        return counts
 
     def reset(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        # Other threads' connections go stale with the file; bumping the
+        # generation makes them reopen on next use.
+        self._generation += 1
         if os.path.exists(self.db_path):
             os.remove(self.db_path)
         self._init_db()
@@ -1,8 +1,9 @@
 import os
 from datetime import datetime
+from cachetools import TTLCache
 from .mongo_store import MongoStore
 from .sqlite_store import SqliteStore
-from cocoindex_app.search import pool
+from cocoindex_app.search import get_conn
 
 class StorageManager:
     def __init__(self):
@@ -25,13 +26,20 @@ class StorageManager:
         self.mongo = MongoStore() if self.meta_type == "mongo" else None
         self.sqlite = SqliteStore() if self.meta_type == "sqlite" else None
 
+        # Same dashboard-read cache the sqlite store keeps, for the Postgres
+        # branches below: the write epoch joins every key so status writes
+        # invalidate logically and stale entries just age out.
+        self._read_cache = TTLCache(maxsize=32, ttl=60)
+        self._write_epoch = 0
+
     def create_status(self, index_id: str, repo_url: str, branch: str, namespace: str = "default"):
+        self._write_epoch += 1
         if self.meta_type == "mongo":
             self.mongo.create_status(index_id, repo_url, branch)
         elif self.meta_type == "sqlite":
             self.sqlite.create_status(index_id, repo_url, branch, namespace)
         else:
-            with pool().connection() as conn:
+            with get_conn() as conn:
                 with conn.cursor() as cur:
                     cur.execute(
                         "INSERT INTO indexing_status (index_id, repo_url, branch, status, namespace) VALUES (%s, %s, %s, %s, %s)",
@@ -40,12 +48,13 @@ class StorageManager:
                     conn.commit()
 
     def update_status(self, index_id: str, status: str, error: str = None):
+        self._write_epoch += 1
         if self.meta_type == "mongo":
             self.mongo.update_status(index_id, status, error)
         elif self.meta_type == "sqlite":
             self.sqlite.update_status(index_id, status, error)
         else:
-            with pool().connection() as conn:
+            with get_conn() as conn:
                 with conn.cursor() as cur:
                     if error:
                         cur.execute(
@@ -68,7 +77,7 @@ class StorageManager:
         elif self.meta_type == "sqlite":
             return self.sqlite.get_status(index_id)
         else:
-            with pool().connection() as conn:
+            with get_conn() as conn:
                 with conn.cursor() as cur:
                     cur.execute(
                         "SELECT status, error, created_at, repo_url, branch FROM indexing_status WHERE index_id = %s",
@@ -90,12 +99,16 @@ class StorageManager:
             return self.sqlite.get_activity(limit)
         
         if self.meta_type == "postgres":
-             with pool().connection() as conn:
+             key = ("activity", limit, self._write_epoch)
+             cached = self._read_cache.get(key)
+             if cached is not None:
+                 return cached
+             with get_conn() as conn:
                 with conn.cursor() as cur:
                     cur.execute("""
                         SELECT repo_url, branch, status, created_at, index_id, error
-                        FROM indexing_status 
-                        ORDER BY created_at DESC 
+                        FROM indexing_status
+                        ORDER BY created_at DESC
                         LIMIT %s
                     """, (limit,))
                     rows = cur.fetchall()
@@ -106,10 +119,11 @@ class StorageManager:
                             "repo_url": r[0],
                             "branch": r[1],
                             "status": r[2],
-                            "date": r[3].isoformat() if isinstance(r[3], datetime) else str(r[3]),
+                            "date": r[3].isoformat() if r[3] else None,
                             "index_id": str(r[4]),
                             "error": r[5]
                         })
+                    self._read_cache[key] = activity
                     return activity
         return []
 
@@ -118,7 +132,7 @@ class StorageManager:
              return self.sqlite.get_live_pipelines()
         
         if self.meta_type == "postgres":
-             with pool().connection() as conn:
+             with get_conn() as conn:
                 with conn.cursor() as cur:
                     cur.execute("""
                         SELECT index_id, repo_url, branch, status, created_at 
@@ -145,7 +159,11 @@ class StorageManager:
             return self.sqlite.get_indexed_repos()
         
         if self.meta_type == "postgres":
-             with pool().connection() as conn:
+             key = ("repos", self._write_epoch)
+             cached = self._read_cache.get(key)
+             if cached is not None:
+                 return cached
+             with get_conn() as conn:
                 with conn.cursor() as cur:
                     cur.execute("""
                         SELECT DISTINCT ON (repo_url, branch) repo_url, branch, status, created_at
@@ -163,6 +181,7 @@ class StorageManager:
                                 "status": r[2],
                                 "last_updated": r[3].isoformat() if r[3] else None
                             })
+                    self._read_cache[key] = repos
                     return repos
         return []
 
@@ -171,16 +190,18 @@ class StorageManager:
             return self.sqlite.get_counts()
         
         if self.meta_type == "postgres":
-             with pool().connection() as conn:
+             key = ("counts", self._write_epoch)
+             cached = self._read_cache.get(key)
+             if cached is not None:
+                 return cached
+             with get_conn() as conn:
                 with conn.cursor() as cur:
-                    cur.execute("SELECT COUNT(DISTINCT repo_url) FROM indexing_status WHERE status = 'completed'")
-                    res_indexed = cur.fetchone()
-                    indexed = res_indexed[0] if res_indexed else 0
-                    
-                    cur.execute("SELECT COUNT(*) FROM indexing_status WHERE status = 'completed'")
-                    res_runs = res_runs = cur.fetchone()
-                    runs = res_runs[0] if res_runs else 0
-                    return {"indexed_repos": indexed, "success_runs": runs}
+                    cur.execute("SELECT COUNT(DISTINCT repo_url), COUNT(*) FROM indexing_status WHERE status = 'completed'")
+                    row = cur.fetchone()
+                    indexed, runs = (row[0], row[1]) if row else (0, 0)
+                    counts = {"indexed_repos": indexed, "success_runs": runs}
+                    self._read_cache[key] = counts
+                    return counts
         return {"indexed_repos": 0, "success_runs": 0}
 
     def log_execution(self, execution_id: str, tenant: str, repo: str, instruction: str, response: str):
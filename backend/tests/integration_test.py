@@ -1,60 +1,155 @@
-import requests
+import os
 import time
-import json
+import httpx
+import numpy as np
+import orjson
 
-BASE_URL = "http://localhost:8000"
+BASE_URL = os.environ.get("CODEMIND_BASE_URL", "http://localhost:8000")
 
-def test_codemind_lifecycle():
-    print("🚀 Starting CodeMind Integration Test Suite...\n")
+# REUSE_INDEX=1 skips the reset and, when the target repo/branch already has
+# a completed index, the multi-minute re-index too — deterministic output
+# for the same input makes redoing it pure waste on local reruns. Default
+# keeps the clean-slate behavior for CI.
+REUSE_INDEX = os.environ.get("REUSE_INDEX") == "1"
+
+# Hard ceiling on the indexing wait so a hung worker fails the test instead
+# of blocking it forever.
+INDEX_TIMEOUT = float(os.environ.get("INDEX_TIMEOUT", "600"))
+
+# Indexing the default repo dominates the suite's runtime. Point TEST_REPO_URL
+# at a small fixture repo (a local path works — git clone accepts it) to cut
+# embedding and storage work by orders of magnitude on the fast path, keeping
+# awesome-python for the slower full run.
+TEST_REPO_URL = os.environ.get("TEST_REPO_URL", "https://github.com/vinta/awesome-python")
+TEST_REPO_BRANCH = os.environ.get("TEST_REPO_BRANCH", "master")
+TEST_REPO_NAME = TEST_REPO_URL.rstrip("/").split("/")[-1].replace(".git", "")
+
+# One keep-alive client for the whole suite — httpx, same HTTP stack the
+# backend itself uses, pooling connections across every call (the status
+# stream included). http2=True is left off: the server runs plain HTTP/1.1
+# under uvicorn and the h2 extra isn't a dependency of this tree.
+SESSION = httpx.Client(
+    base_url=BASE_URL,
+    headers={"Content-Type": "application/json"},
+    limits=httpx.Limits(max_connections=8, max_keepalive_connections=4),
+    timeout=60.0,
+)
+
+
+def _post(path, body=None):
+    return SESSION.post(path, content=body)
+
+
+# Request bodies are fixed for the whole run, so serialize them once at
+# import instead of per call.
+_INDEX_BODY = orjson.dumps({
+    "repo_url": TEST_REPO_URL,
+    "branch": TEST_REPO_BRANCH
+})
+_SEARCH_BATCH_BODY = orjson.dumps({"requests": [
+    {
+        "query": "Where are audio libraries?",
+        "repo": TEST_REPO_NAME,
+        "branch": TEST_REPO_BRANCH
+    },
+    {
+        "query": "python",
+        "repo": "non_existent_repo",
+        "branch": TEST_REPO_BRANCH
+    }
+]})
+_EXECUTE_BODY = orjson.dumps({
+    "tenant": "test_user",
+    "repo": TEST_REPO_NAME,
+    "branch": TEST_REPO_BRANCH,
+    "instruction": "Summarize what this repository offers for Web Frameworks based on the context.",
+    "context_query": "web frameworks"
+})
+
+
+# Steps 1-3 are a shared serial prerequisite; the lazy guard lets each test
+# function run standalone (pytest collects them individually) while a full
+# run pays for setup/index exactly once.
+_indexed = False
+
+
+def _ensure_indexed():
+    global _indexed
+    if _indexed:
+        return
+    print("🚀 Preparing CodeMind environment...\n")
 
     # 1. Setup Environment
     print("Step 1: Initializing Environment...")
-    resp = requests.post(f"{BASE_URL}/setup")
+    resp = _post("/setup")
     assert resp.status_code == 200
-    print(f"✅ Setup: {resp.json()['status']}\n")
+    print(f"✅ Setup: {orjson.loads(resp.content)['status']}\n")
 
     # 2. Reset Data (Clean Slate)
-    print("Step 2: Resetting System...")
-    resp = requests.post(f"{BASE_URL}/reset")
-    assert resp.status_code == 200
-    print("✅ Reset Complete\n")
+    if REUSE_INDEX:
+        print("Step 2: Skipping reset (REUSE_INDEX=1)\n")
+    else:
+        print("Step 2: Resetting System...")
+        resp = _post("/reset")
+        assert resp.status_code == 200
+        print("✅ Reset Complete\n")
 
     # 3. Index a Repository
     print("Step 3: Triggering Indexing...")
-    # Using a small repo for testing speed
-    index_payload = {
-        "repo_url": "https://github.com/vinta/awesome-python", 
-        "branch": "master"
-    }
-    resp = requests.post(f"{BASE_URL}/index", json=index_payload)
-    assert resp.status_code == 200
-    index_id = resp.json()["index_id"]
-    print(f"✅ Indexing Started: {index_id}")
-    
-    print("⌛ Waiting for indexing to complete (Polling /status)...")
-    status = "started"
-    while status == "started":
-        time.sleep(2)
-        status_resp = requests.get(f"{BASE_URL}/status/{index_id}")
-        assert status_resp.status_code == 200
-        status = status_resp.json()["status"]
-        print(f"   Current Status: {status}")
-        if status == "failed":
-            print(f"❌ Indexing Failed: {status_resp.json()['error']}")
-            assert False
-    
-    print(f"✅ Indexing Finished with status: {status}\n")
+    already_indexed = False
+    if REUSE_INDEX:
+        resp = SESSION.get("/repos")
+        if resp.status_code == 200:
+            already_indexed = any(
+                r["name"] == TEST_REPO_NAME and r["branch"] == TEST_REPO_BRANCH
+                for r in orjson.loads(resp.content)
+            )
 
-    # 4. Test Search (Semantic & Structural)
+    if already_indexed:
+        print("✅ Existing completed index found, skipping re-index\n")
+    else:
+        resp = _post("/index", _INDEX_BODY)
+        assert resp.status_code == 200
+        index_id = orjson.loads(resp.content)["index_id"]
+        print(f"✅ Indexing Started: {index_id}")
+
+        print("⌛ Waiting for indexing to complete (SSE /status stream)...")
+        # One server-push connection replaces the poll loop: the server
+        # emits a frame per status transition and closes on a terminal
+        # state, so completion is observed within its 250ms watch tick.
+        # The monotonic deadline keeps a hung indexer from stalling forever.
+        t0 = time.monotonic()
+        deadline = t0 + INDEX_TIMEOUT
+        status = "started"
+        with SESSION.stream("GET", f"/status/{index_id}/stream", timeout=INDEX_TIMEOUT) as stream:
+            assert stream.status_code == 200
+            for line in stream.iter_lines():
+                assert time.monotonic() < deadline, "indexing timed out"
+                if not line.startswith("data:"):
+                    continue
+                status_data = orjson.loads(line[5:])
+                status = status_data["status"]
+                print(f"   Current Status: {status}")
+                if status == "failed":
+                    print(f"❌ Indexing Failed: {status_data['error']}")
+                    assert False
+        assert status == "completed", f"indexing ended in state {status!r}"
+
+        print(f"✅ Indexing Finished with status: {status} in {time.monotonic() - t0:.1f}s\n")
+
+    _indexed = True
+
+
+def test_search_and_isolation():
+    # 4 & 6. Search intelligence + repository isolation — both queries go
+    # out in a single batch request since they are independent.
+    _ensure_indexed()
     print("Step 4: Testing Search Intelligence...")
-    search_payload = {
-        "query": "Where are audio libraries?",
-        "repo": "awesome-python",
-        "branch": "master"
-    }
-    resp = requests.post(f"{BASE_URL}/search", json=search_payload)
+    # One batched POST instead of two: the server shares embedding-cache
+    # lookups and overlaps both ANN searches internally.
+    resp = _post("/search/batch", _SEARCH_BATCH_BODY)
     assert resp.status_code == 200
-    results = resp.json()["results"]
+    results, iso_results = orjson.loads(resp.content)["results"]
     assert len(results) > 0
     
     top_result = results[0]
@@ -65,38 +160,31 @@ def test_codemind_lifecycle():
     assert "calls" in top_result
     print(f"✅ AST Metadata Verified: {len(top_result['symbols'])} symbols found")
     
-    # Check for structural boost
-    boosted = [r for r in results if r.get("structural_boost")]
-    if boosted:
-        print(f"🔥 Hybrid Reranking Active: {len(boosted)} results received structural boost")
+    # Check for structural boost — boolean mask instead of a Python-level
+    # filter loop, which stays flat as batched searches grow the result set.
+    boosts = np.fromiter((bool(r.get("structural_boost")) for r in results), dtype=bool)
+    n_boosted = int(boosts.sum())
+    if n_boosted:
+        print(f"🔥 Hybrid Reranking Active: {n_boosted} results received structural boost")
     print()
 
-    # 5. Test RAG Execution
+    # 6. Verify Isolation (fetched in the same batch as step 4)
+    print("Step 6: Verifying Repository Isolation...")
+    assert len(iso_results) == 0
+    print("✅ Repository Isolation Confirmed\n")
+
+
+def test_execute():
+    # 5. RAG execution over the indexed context.
+    _ensure_indexed()
     print("Step 5: Testing RAG Execution (/execute)...")
-    execute_payload = {
-        "tenant": "test_user",
-        "repo": "awesome-python",
-        "branch": "master",
-        "instruction": "Summarize what this repository offers for Web Frameworks based on the context.",
-        "context_query": "web frameworks"
-    }
-    resp = requests.post(f"{BASE_URL}/execute", json=execute_payload)
+    resp = _post("/execute", _EXECUTE_BODY)
     assert resp.status_code == 200
     print("✅ RAG Response Received")
-    print(f"LLM OUTPUT SNIPPET: {resp.json()['result'][:200]}...\n")
-
-    # 6. Verify Isolation
-    print("Step 6: Verifying Repository Isolation...")
-    search_payload_empty = {
-        "query": "python",
-        "repo": "non_existent_repo",
-        "branch": "master"
-    }
-    resp = requests.post(f"{BASE_URL}/search", json=search_payload_empty)
-    assert len(resp.json()["results"]) == 0
-    print("✅ Repository Isolation Confirmed\n")
+    print(f"LLM OUTPUT SNIPPET: {orjson.loads(resp.content)['result'][:200]}...\n")
 
-    print("🎉 Integration Test Suite Successful!")
 
 if __name__ == "__main__":
-    test_codemind_lifecycle()
+    test_search_and_isolation()
+    test_execute()
+    print("🎉 Integration Test Suite Successful!")